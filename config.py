@@ -6,27 +6,45 @@ class Settings(BaseSettings):
     APP_NAME: str = "InternLink API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    ENV: str = "development"  # development, test, production
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    SLOW_QUERY_MS: int = 100  # log queries slower than this; 0 disables
+
+    # Worker threads for sync (def) routes; each holds a DB connection while it runs
+    THREADPOOL_SIZE: int = 40
+
+    # Browser origins allowed by CORS; list the real frontend origins in production
+    CORS_ORIGINS: list = ["*"]
 
     # JWT
     JWT_SECRET_KEY: str = "internlink-super-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    LOGIN_RATE_LIMIT_PER_MINUTE: int = 20  # per client IP and per (email, IP); per worker process
 
     # File Uploads
     UPLOAD_DIR: str = os.path.join(os.path.dirname(__file__), "uploads")
     MAX_RESUME_SIZE_MB: int = 10
     ALLOWED_RESUME_EXTENSIONS: list = [".pdf", ".doc", ".docx", ".txt"]
 
+    # Caching (in-process, per worker)
+    CACHE_MAX_ENTRIES: int = 10000
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60
+    USER_SKILLS_CACHE_TTL_SECONDS: int = 300
+    INTERVIEW_PREP_CACHE_TTL_SECONDS: int = 3600
+    RECOMMENDATIONS_CACHE_TTL_SECONDS: int = 120
+    RECRUITER_JOBS_CACHE_TTL_SECONDS: int = 60
+    SOCIAL_CACHE_TTL_SECONDS: int = 30
+    JOB_SEARCH_CACHE_TTL_SECONDS: int = 90
+
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
-
-# Ensure upload directory exists
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-os.makedirs(os.path.join(settings.UPLOAD_DIR, "resumes"), exist_ok=True)
-os.makedirs(os.path.join(settings.UPLOAD_DIR, "media"), exist_ok=True)
@@ -1,18 +1,67 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from sqlalchemy import create_engine, event, inspect, literal, text, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, raiseload
+from sqlalchemy.pool import StaticPool
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+db_url = make_url(settings.DATABASE_URL)
 connect_args = {}
-if settings.DATABASE_URL.startswith("sqlite"):
+engine_kwargs = {}
+if db_url.get_backend_name() == "sqlite":
     connect_args["check_same_thread"] = False
+    if db_url.database in (None, "", ":memory:"):
+        # An in-memory database lives in one connection; share it instead of giving each checkout an empty db
+        engine_kwargs["poolclass"] = StaticPool
+else:
+    # LIFO keeps the most recently used connections hot and lets idle overflow ones time out
+    engine_kwargs.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+    )
+if db_url.get_driver_name() == "psycopg2":
+    # Send multi-row INSERTs as batched VALUES lists instead of one statement per row
+    engine_kwargs["executemany_mode"] = "values_plus_batch"
+
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args, **engine_kwargs)
+
+if settings.SLOW_QUERY_MS > 0:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
 
-engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms): %s", elapsed_ms, statement)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# JSON column type stored as binary JSONB on Postgres (indexable, no reparse on read), plain JSON elsewhere
+PortableJSON = JSON().with_variant(JSONB(), "postgresql")
+
+
+def strict_loading_options() -> tuple:
+    """raiseload("*") outside production, so a lazy load a list query didn't plan for fails loudly."""
+    return (raiseload("*"),) if settings.ENV != "production" else ()
+
+
+def row_exists(db, query) -> bool:
+    """True if the query matches any row, via SELECT EXISTS instead of fetching or counting."""
+    return db.query(query.exists()).scalar()
+
 
 def get_db():
     """Dependency to get database session."""
@@ -23,8 +72,8 @@ def get_db():
         db.close()
 
 
-def create_tables():
-    """Create all database tables."""
+def import_models():
+    """Import every model module so Base.metadata knows all tables."""
     from models.user import User, UserProfile, Resume
     from models.recruiter import RecruiterProfile
     from models.job import Job
@@ -33,4 +82,65 @@ def create_tables():
     from models.notification import Notification
     from models.interview import Interview, InterviewPrep
     from models.dispute import Dispute
+
+
+def create_tables() -> list:
+    """Create all database tables and bring existing ones up to the models; returns "table.column"s added.
+
+    create_all only creates missing tables, so columns and indexes added to existing tables are applied here.
+    """
+    import_models()
     Base.metadata.create_all(bind=engine)
+    added = add_missing_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return added
+
+
+def missing_tables() -> list:
+    """Names of model tables that don't exist in the database."""
+    import_models()
+    existing = set(inspect(engine).get_table_names())
+    return sorted(set(Base.metadata.tables) - existing)
+
+
+def missing_columns() -> list:
+    """Model columns absent from tables that already exist; create_all never adds columns to an existing table."""
+    import_models()
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            missing.extend(column for column in table.columns if column.name not in present)
+    return missing
+
+
+def add_column_statements(columns) -> list:
+    """ALTER TABLE ... ADD COLUMN statements for the given (nullable) model columns.
+
+    A column whose info carries "existing_rows" also gets an UPDATE filling that value into the rows already there.
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    statements = []
+    for column in columns:
+        table, name = quote(column.table.name), quote(column.name)
+        statements.append(f"ALTER TABLE {table} ADD COLUMN {name} {column.type.compile(dialect=engine.dialect)}")
+        if "existing_rows" in column.info:
+            value = literal(column.info["existing_rows"], column.type).compile(
+                dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+            )
+            statements.append(f"UPDATE {table} SET {name} = {value}")
+    return statements
+
+
+def add_missing_columns() -> list:
+    """Add model columns that an older database lacks; returns "table.column" names added."""
+    columns = missing_columns()
+    if columns:
+        with engine.begin() as conn:
+            for statement in add_column_statements(columns):
+                conn.execute(text(statement))
+    return [f"{column.table.name}.{column.name}" for column in columns]
@@ -1,6 +1,8 @@
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from database import create_tables
+from database import create_tables, missing_tables, missing_columns, add_column_statements, SessionLocal
 from routes.auth_routes import router as auth_router
 from routes.user_routes import router as user_router
 from routes.recruiter_routes import router as recruiter_router
@@ -9,6 +11,7 @@ from routes.social_routes import router as social_router
 from routes.notification_routes import router as notification_router
 from routes.interview_routes import router as interview_router
 from routes.ai_routes import router as ai_router
+from services.search_service import backfill_job_skills_search
 from config import settings
 
 app = FastAPI(
@@ -26,12 +29,13 @@ app = FastAPI(
     """,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -48,10 +52,29 @@ app.include_router(interview_router)
 app.include_router(ai_router)
 
 
+@app.on_event("startup")
+async def configure_threadpool():
+    """Size the threadpool that runs the sync route handlers."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
 @app.on_event("startup")
 def startup():
-    """Create database tables on startup."""
-    create_tables()
+    """Create database tables on startup (production only checks they exist; its schema is managed outside the app)."""
+    if settings.ENV == "production":
+        missing = missing_tables()
+        if missing:
+            raise RuntimeError(f"Database is missing tables: {', '.join(missing)}")
+        columns = missing_columns()
+        if columns:
+            raise RuntimeError(
+                "Database is missing columns; apply:\n" + ";\n".join(add_column_statements(columns)) + ";"
+            )
+    else:
+        for column in create_tables():
+            print(f"Added missing column {column}")
+    with SessionLocal() as db:
+        backfill_job_skills_search(db)
     print(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} started!")
     print(f"📄 API Docs: http://127.0.0.1:8000/docs")
 
@@ -69,3 +92,10 @@ def root():
 @app.get("/health", tags=["Root"])
 def health_check():
     return {"status": "healthy"}
+
+
+if __name__ == "__main__":
+    # uvicorn picks uvloop and httptools automatically when they are installed.
+    # Production: gunicorn main:app -k uvicorn.workers.UvicornWorker -w <2 x cores + 1>
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8000, loop="auto", http="auto")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Index, desc
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,6 +6,10 @@ from database import Base
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        Index("ix_applications_job_score", "job_id", desc("matching_score")),
+        Index("ix_applications_user_applied", "user_id", desc("applied_at")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -22,8 +26,9 @@ class Application(Base):
     user = relationship("User", back_populates="applications")
     job = relationship("Job", back_populates="applications")
     resume = relationship("Resume")
-    status_history = relationship("ApplicationStatusHistory", back_populates="application", cascade="all, delete-orphan")
-    interviews = relationship("Interview", back_populates="application", cascade="all, delete-orphan")
+    # Collections must be loaded explicitly (selectinload) - lazy access raises instead of querying per row
+    status_history = relationship("ApplicationStatusHistory", back_populates="application", lazy="raise_on_sql", cascade="all, delete-orphan")
+    interviews = relationship("Interview", back_populates="application", lazy="raise_on_sql", cascade="all, delete-orphan")
 
 
 class ApplicationStatusHistory(Base):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, desc
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,6 +6,9 @@ from database import Base
 
 class Dispute(Base):
     __tablename__ = "disputes"
+    __table_args__ = (
+        Index("ix_disputes_status_created", "status", desc("created_at")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filed_by = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from database import Base
+from database import Base, PortableJSON
 
 
 class Interview(Base):
     __tablename__ = "interviews"
+    __table_args__ = (
+        Index("ix_interview_app_sched", "application_id", "scheduled_at"),
+        Index("ix_interview_status_sched", "status", "scheduled_at"),
+        Index("ix_interview_recruiter_sched", "recruiter_id", "scheduled_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
+    # Copy of the job's recruiter, so ownership checks don't hop through Application -> Job
+    recruiter_id = Column(Integer, ForeignKey("recruiter_profiles.id"), nullable=True)
     scheduled_at = Column(DateTime, nullable=False)
     duration_minutes = Column(Integer, default=30)
     meeting_url = Column(String(500), nullable=True)
@@ -24,15 +31,20 @@ class Interview(Base):
 
 class InterviewPrep(Base):
     __tablename__ = "interview_preps"
+    __table_args__ = (
+        Index("ix_interview_preps_user_job_hash", "user_id", "job_id", "skills_hash"),
+        Index("ix_interview_preps_focus_areas", "focus_areas", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
-    questions = Column(JSON, default=list)
+    skills_hash = Column(String(64), nullable=True)  # sha256 of the inputs the prep was generated from
+    questions = Column(PortableJSON, default=list)
     # [{"question": "...", "category": "technical/behavioral", "difficulty": "easy/medium/hard", "sample_answer": "..."}]
-    tips = Column(JSON, default=list)
+    tips = Column(PortableJSON, default=list)
     # ["Tip 1", "Tip 2", ...]
-    focus_areas = Column(JSON, default=list)
+    focus_areas = Column(PortableJSON, default=list)
     # ["Data Structures", "System Design", ...]
     created_at = Column(DateTime, default=datetime.utcnow)
 
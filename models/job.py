@@ -1,11 +1,31 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, JSON, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, JSON, ForeignKey, Index, desc, text
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
-from database import Base
+from database import Base, PortableJSON
+
+# Full-text document for job search; the GIN index and the search query must use this exact expression
+JOB_SEARCH_TSVECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def search_skills(skills) -> list:
+    """Lowercased, trimmed copy of a skills list, as stored in Job.skills_search."""
+    return [s.strip().lower() for s in (skills or []) if s and s.strip()]
 
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Partial index: only the (few) jobs awaiting admin approval
+        Index(
+            "ix_jobs_pending", "created_at",
+            postgresql_where=text("is_approved = false"),
+            sqlite_where=text("is_approved = false"),
+        ),
+        Index("ix_jobs_skills_search", "skills_search", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_jobs_search_tsv", text(JOB_SEARCH_TSVECTOR), postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_jobs_recruiter_active", "recruiter_id", "is_active"),
+        Index("ix_jobs_recruiter_created", "recruiter_id", desc("created_at")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     recruiter_id = Column(Integer, ForeignKey("recruiter_profiles.id"), nullable=False)
@@ -13,6 +33,7 @@ class Job(Base):
     description = Column(Text, nullable=False)
     requirements = Column(JSON, default=list)  # ["2 years exp", "CS degree", ...]
     skills_required = Column(JSON, default=list)  # ["Python", "Django", ...]
+    skills_search = Column(PortableJSON, default=list)  # lowercased copy of skills_required, for indexed search
     location = Column(String(255), nullable=True, index=True)
     is_remote = Column(Boolean, default=False)
     stipend_min = Column(Float, nullable=True)
@@ -30,3 +51,8 @@ class Job(Base):
     # Relationships
     recruiter = relationship("RecruiterProfile", back_populates="jobs")
     applications = relationship("Application", back_populates="job", cascade="all, delete-orphan")
+
+    @validates("skills_required")
+    def _sync_skills_search(self, key, skills):
+        self.skills_search = search_skills(skills)
+        return skills
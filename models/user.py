@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,6 +6,7 @@ from database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_role_active_id", "role", "is_active", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -54,8 +55,11 @@ class Resume(Base):
     filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)  # resolved at upload so downloads don't re-guess it
     parsed_skills = Column(JSON, default=list)
     parsed_text = Column(Text, nullable=True)
+    # Resumes saved before background parsing were parsed during upload, so rows that predate the column get "done"
+    parse_status = Column(String(20), default="pending", info={"existing_rows": "done"})  # pending, done, failed (parsed in a background task)
     is_primary = Column(Boolean, default=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, raiseload
+from pydantic import TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 from database import get_db
@@ -11,34 +13,62 @@ from schemas.admin_schemas import AdminUserUpdate, AdminJobApproval, DisputeCrea
 from schemas.user_schemas import UserResponse
 from schemas.job_schemas import JobResponse
 from utils.dependencies import get_current_user, require_role
-from services.analytics_service import get_platform_analytics
-from services.notification_service import create_notification
+from services.analytics_service import get_platform_analytics, invalidate_recruiter_cache
+from services.notification_service import create_notification, create_notifications_batch
+from services.cache_service import cache
+from services.ai_service import invalidate_recommendations
+from services.search_service import invalidate_job_search
+from config import settings
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+PLATFORM_ANALYTICS_CACHE_KEY = "platform_analytics:v1"
+
+# List validators built once at import instead of per request
+_job_list_adapter = TypeAdapter(List[JobResponse])
+_dispute_list_adapter = TypeAdapter(List[DisputeResponse])
+
 
 # --- User Management ---
 @router.get("/users", response_model=List[UserResponse])
 def list_users(
+    response: Response,
     role: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
+    after_id: Optional[int] = Query(None, description="Return users with an id greater than this (keyset cursor)"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     current_user: User = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
-    """List all users with optional filters."""
-    query = db.query(User)
+    """List all users with optional filters, paged by `after_id` cursor or `page`.
+
+    Page-based requests also get the filtered total in an `X-Total-Count` header.
+    """
+    query = db.query(User).options(
+        selectinload(User.profile), selectinload(User.resumes), raiseload("*")
+    )
 
     if role:
         query = query.filter(User.role == role)
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
 
-    total = query.count()
-    users = query.offset((page - 1) * page_size).limit(page_size).all()
+    query = query.order_by(User.id)
+    if after_id is not None:
+        return query.filter(User.id > after_id).limit(page_size).all()
 
-    return users
+    # Total rides along on every row via COUNT(*) OVER (), no separate count query
+    rows = query.add_columns(func.count().over().label("total")).offset(
+        (page - 1) * page_size
+    ).limit(page_size).all()
+    if rows:
+        total = rows[0].total
+    else:
+        total = query.count() if page > 1 else 0
+    response.headers["X-Total-Count"] = str(total)
+
+    return [row[0] for row in rows]
 
 
 @router.put("/users/{user_id}")
@@ -59,7 +89,7 @@ def update_user(
         user.role = user_update.role
 
     db.commit()
-    db.refresh(user)
+    cache.delete(PLATFORM_ANALYTICS_CACHE_KEY)
 
     return {"message": "User updated successfully", "user_id": user_id}
 
@@ -88,21 +118,24 @@ def list_recruiters(
     db: Session = Depends(get_db)
 ):
     """List all recruiters with their company profiles."""
-    recruiters = db.query(User).filter(User.role == "recruiter").all()
-    result = []
-    for r in recruiters:
-        profile = db.query(RecruiterProfile).filter(
-            RecruiterProfile.user_id == r.id
-        ).first()
-        result.append({
+    rows = db.query(
+        User.id, User.email, User.is_active, User.created_at,
+        RecruiterProfile.company_name, RecruiterProfile.industry,
+    ).outerjoin(
+        RecruiterProfile, RecruiterProfile.user_id == User.id
+    ).filter(User.role == "recruiter").all()
+
+    return [
+        {
             "id": r.id,
             "email": r.email,
             "is_active": r.is_active,
             "created_at": r.created_at.isoformat(),
-            "company_name": profile.company_name if profile else None,
-            "industry": profile.industry if profile else None,
-        })
-    return result
+            "company_name": r.company_name,
+            "industry": r.industry,
+        }
+        for r in rows
+    ]
 
 
 @router.put("/recruiters/{user_id}")
@@ -131,16 +164,12 @@ def get_pending_jobs(
     db: Session = Depends(get_db)
 ):
     """Get jobs pending approval."""
-    jobs = db.query(Job).filter(Job.is_approved == False).order_by(Job.created_at.desc()).all()
-    result = []
-    for job in jobs:
-        recruiter = db.query(RecruiterProfile).filter(
-            RecruiterProfile.id == job.recruiter_id
-        ).first()
-        result.append(JobResponse(
-            **{c.name: getattr(job, c.name) for c in job.__table__.columns},
-            company_name=recruiter.company_name if recruiter else None,
-        ))
+    jobs = db.query(Job).options(
+        selectinload(Job.recruiter), raiseload("*")
+    ).filter(Job.is_approved == False).order_by(Job.created_at.desc()).all()
+    result = _job_list_adapter.validate_python(jobs, from_attributes=True)
+    for response, job in zip(result, jobs):
+        response.company_name = job.recruiter.company_name if job.recruiter else None
     return result
 
 
@@ -148,6 +177,7 @@ def get_pending_jobs(
 def approve_or_reject_job(
     job_id: int,
     approval: AdminJobApproval,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
@@ -157,20 +187,27 @@ def approve_or_reject_job(
         raise HTTPException(status_code=404, detail="Job not found")
 
     job.is_approved = approval.is_approved
-    db.commit()
 
-    # Notify recruiter
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.id == job.recruiter_id
-    ).first()
+    # Notify recruiter after the response is sent, off the request's transaction
+    recruiter = job.recruiter
     if recruiter:
+        recruiter_user_id = recruiter.user_id
         status_text = "approved" if approval.is_approved else "rejected"
-        create_notification(
-            db, recruiter.user_id, "job_approved",
-            f"Job {status_text.title()}",
-            f"Your job posting '{job.title}' has been {status_text}." + (f" Notes: {approval.notes}" if approval.notes else ""),
-            reference_id=job.id, reference_type="job",
-        )
+        background_tasks.add_task(create_notifications_batch, [{
+            "user_id": recruiter.user_id,
+            "type": "job_approved",
+            "title": f"Job {status_text.title()}",
+            "message": f"Your job posting '{job.title}' has been {status_text}." + (f" Notes: {approval.notes}" if approval.notes else ""),
+            "reference_id": job.id,
+            "reference_type": "job",
+        }])
+
+    db.commit()
+    cache.delete(PLATFORM_ANALYTICS_CACHE_KEY)
+    invalidate_recommendations()
+    invalidate_job_search()
+    if recruiter:
+        invalidate_recruiter_cache(recruiter_user_id)
 
     return {
         "message": f"Job {'approved' if approval.is_approved else 'rejected'} successfully",
@@ -184,8 +221,12 @@ def platform_analytics(
     current_user: User = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
-    """Get platform-wide analytics."""
-    return get_platform_analytics(db)
+    """Get platform-wide analytics (cached briefly, the dashboard polls it)."""
+    analytics = cache.get(PLATFORM_ANALYTICS_CACHE_KEY)
+    if analytics is None:
+        analytics = get_platform_analytics(db)
+        cache.set(PLATFORM_ANALYTICS_CACHE_KEY, analytics, settings.ANALYTICS_CACHE_TTL_SECONDS)
+    return analytics
 
 
 # --- Disputes ---
@@ -196,11 +237,11 @@ def list_disputes(
     db: Session = Depends(get_db)
 ):
     """List all disputes."""
-    query = db.query(Dispute)
+    query = db.query(Dispute).options(raiseload("*"))
     if status_filter:
         query = query.filter(Dispute.status == status_filter)
     disputes = query.order_by(Dispute.created_at.desc()).all()
-    return disputes
+    return _dispute_list_adapter.validate_python(disputes, from_attributes=True)
 
 
 @router.put("/disputes/{dispute_id}", response_model=DisputeResponse)
@@ -223,18 +264,19 @@ def update_dispute(
     if dispute_update.status in ["resolved", "dismissed"]:
         dispute.resolved_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(dispute)
-
     # Notify the user who filed the dispute
     create_notification(
         db, dispute.filed_by, "dispute_update",
         "Dispute Updated",
         f"Your dispute '{dispute.subject}' status: {dispute.status}",
-        reference_id=dispute.id, reference_type="dispute",
+        reference_id=dispute.id, reference_type="dispute", commit=False,
     )
 
-    return dispute
+    # create_notification flushed, so updated columns are set; no refresh SELECT after commit
+    response = DisputeResponse.model_validate(dispute)
+    db.commit()
+
+    return response
 
 
 # --- File a Dispute (available to any authenticated user) ---
@@ -253,6 +295,7 @@ def file_dispute(
         description=dispute_data.description,
     )
     db.add(dispute)
+    db.flush()
+    response = DisputeResponse.model_validate(dispute)
     db.commit()
-    db.refresh(dispute)
-    return dispute
+    return response
@@ -1,39 +1,63 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from database import get_db
 from models.user import User, UserProfile, Resume
 from models.job import Job
-from models.recruiter import RecruiterProfile
 from models.interview import InterviewPrep
 from schemas.ai_schemas import ResumeMatchResponse, JobRecommendation, SkillGapResponse, InterviewPrepResponse
 from utils.dependencies import get_current_user
-from services.ai_service import get_resume_match_score, get_personalized_recommendations, get_skill_gap_analysis, generate_interview_prep
+from services.ai_service import (
+    normalize_skills, get_resume_match_score, get_personalized_recommendations, get_skill_gap_analysis,
+    generate_interview_prep, interview_prep_hash, recommendations_cache_key,
+    COMPANY_RESEARCH_POINTS, USER_SKILLS_CACHE_KEY,
+)
+from services.cache_service import cache
+from config import settings
 from typing import List
+import random
 
 router = APIRouter(prefix="/ai", tags=["AI Features"])
 
-
-def _get_user_skills(db: Session, user_id: int) -> tuple:
-    """Get user skills from profile and resume."""
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
-    resume = db.query(Resume).filter(Resume.user_id == user_id, Resume.is_primary == True).first()
-    skills = set()
-    if profile and profile.skills:
-        skills.update(profile.skills)
-    if resume and resume.parsed_skills:
-        skills.update(resume.parsed_skills)
-    resume_text = resume.parsed_text if resume and resume.parsed_text else ""
-    return list(skills), resume_text
+CHAT_FOLLOW_UPS = (
+    "That's a good point. How would you apply that to a real-world project?",
+    "Can you elaborate on the technical aspects of that?",
+    "Interesting! What was the most challenging part of that experience?",
+    "How do you usually handle disagreements with team members during such projects?",
+    "That sounds like a solid approach. Let's move to a technical question. How do you ensure your code is scalable?",
+)
+
+
+def get_user_skills(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> tuple:
+    """Dependency returning (normalized skills frozenset, resume_text) for the current user, resolved once per request."""
+    cache_key = USER_SKILLS_CACHE_KEY.format(user_id=current_user.id)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    row = db.query(
+        UserProfile.skills, Resume.parsed_skills, Resume.parsed_text
+    ).select_from(User).outerjoin(
+        UserProfile, UserProfile.user_id == User.id
+    ).outerjoin(
+        Resume, and_(Resume.user_id == User.id, Resume.is_primary == True)
+    ).filter(User.id == current_user.id).first()
+
+    if row is None:
+        return frozenset(), ""
+    user_skills = normalize_skills(row.skills, row.parsed_skills), row.parsed_text or ""
+    cache.set(cache_key, user_skills, settings.USER_SKILLS_CACHE_TTL_SECONDS)
+    return user_skills
 
 
 @router.get("/resume-match/{job_id}", response_model=ResumeMatchResponse)
-def smart_resume_match(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def smart_resume_match(job_id: int, user_skills: tuple = Depends(get_user_skills), db: Session = Depends(get_db)):
     """Get smart resume matching score for a job."""
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    skills, resume_text = _get_user_skills(db, current_user.id)
+    skills, resume_text = user_skills
     result = get_resume_match_score(skills, resume_text, job)
 
     return ResumeMatchResponse(
@@ -48,21 +72,31 @@ def smart_resume_match(job_id: int, current_user: User = Depends(get_current_use
 
 
 @router.get("/recommendations", response_model=List[JobRecommendation])
-def get_recommendations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_recommendations(
+    user_skills: tuple = Depends(get_user_skills),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     """Get personalized job recommendations."""
-    skills, _ = _get_user_skills(db, current_user.id)
-    recommendations = get_personalized_recommendations(db, current_user.id, skills)
-    return [JobRecommendation(**r) for r in recommendations]
+    skills, _ = user_skills
+    cache_key = recommendations_cache_key(current_user.id, skills)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    recommendations = [JobRecommendation(**r) for r in get_personalized_recommendations(db, current_user.id, skills)]
+    cache.set(cache_key, recommendations, settings.RECOMMENDATIONS_CACHE_TTL_SECONDS)
+    return recommendations
 
 
 @router.get("/skill-gap/{job_id}", response_model=SkillGapResponse)
-def skill_gap_analysis(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def skill_gap_analysis(job_id: int, user_skills: tuple = Depends(get_user_skills), db: Session = Depends(get_db)):
     """Get skill gap analysis for a job."""
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    skills, _ = _get_user_skills(db, current_user.id)
+    skills, _ = user_skills
     result = get_skill_gap_analysis(skills, job)
 
     return SkillGapResponse(
@@ -77,36 +111,55 @@ def skill_gap_analysis(job_id: int, current_user: User = Depends(get_current_use
 
 
 @router.get("/interview-prep/{job_id}", response_model=InterviewPrepResponse)
-def interview_preparation(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def interview_preparation(
+    job_id: int,
+    user_skills: tuple = Depends(get_user_skills),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     """Get AI-powered interview preparation for a job."""
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    skills, _ = _get_user_skills(db, current_user.id)
-    result = generate_interview_prep(job, skills)
-
-    # Save prep for user
-    prep = InterviewPrep(
-        user_id=current_user.id, job_id=job.id,
-        questions=result["questions"], tips=result["tips"],
-        focus_areas=result["focus_areas"],
-    )
-    db.add(prep)
-    db.commit()
-
-    recruiter = db.query(RecruiterProfile).filter(RecruiterProfile.id == job.recruiter_id).first()
-
-    return InterviewPrepResponse(
+    skills, _ = user_skills
+    skills_hash = interview_prep_hash(job, skills)
+
+    # The hash covers the job's updated_at, so edited jobs never hit a stale entry
+    cache_key = f"interview_prep:{current_user.id}:{skills_hash}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Reuse the saved prep when neither the user's skills nor the job changed
+    prep = db.query(InterviewPrep).filter(
+        InterviewPrep.user_id == current_user.id,
+        InterviewPrep.job_id == job.id,
+        InterviewPrep.skills_hash == skills_hash,
+    ).first()
+
+    if not prep:
+        result = generate_interview_prep(job, skills)
+        prep = InterviewPrep(
+            user_id=current_user.id, job_id=job.id, skills_hash=skills_hash,
+            questions=result["questions"], tips=result["tips"],
+            focus_areas=result["focus_areas"],
+        )
+        db.add(prep)
+        db.commit()
+
+    response = InterviewPrepResponse(
         job_id=job.id, job_title=job.title,
-        questions=result["questions"], tips=result["tips"],
-        focus_areas=result["focus_areas"],
-        company_research_points=result["company_research_points"],
+        questions=prep.questions, tips=prep.tips,
+        focus_areas=prep.focus_areas,
+        company_research_points=COMPANY_RESEARCH_POINTS,
     )
+    cache.set(cache_key, response, settings.INTERVIEW_PREP_CACHE_TTL_SECONDS)
+    return response
 @router.post("/interview-chat/{job_id}")
 def interview_chat(job_id: int, message_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Handle chat interaction for interview prep."""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = db.query(Job.id).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -119,11 +172,4 @@ def interview_chat(job_id: int, message_data: dict, current_user: User = Depends
     if "star" in message:
         return {"response": "Exactly! The **STAR** method (Situation, Task, Action, Result) is the best way to structure your answers."}
 
-    responses = [
-        "That's a good point. How would you apply that to a real-world project?",
-        "Can you elaborate on the technical aspects of that?",
-        "Interesting! What was the most challenging part of that experience?",
-        "How do you usually handle disagreements with team members during such projects?",
-        "That sounds like a solid approach. Let's move to a technical question. How do you ensure your code is scalable?"
-    ]
-    return {"response": random.choice(responses)}
+    return {"response": random.choice(CHAT_FOLLOW_UPS)}
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, row_exists
 from models.user import User, UserProfile
 from models.recruiter import RecruiterProfile
 from schemas.user_schemas import UserRegister, UserLogin, Token
-from services.auth_service import hash_password, verify_password, create_access_token
+from services.auth_service import hash_password, verify_password, password_needs_rehash, create_access_token
+from services.cache_service import cache
+from config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -13,8 +15,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """Register a new user or recruiter."""
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
+    if row_exists(db, db.query(User.id).filter(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -41,8 +42,7 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         role=user_data.role,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()  # assigns new_user.id; user and profiles commit together below
 
     # Create empty profile
     profile = UserProfile(user_id=new_user.id)
@@ -56,21 +56,43 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
         db.add(recruiter_profile)
 
+    # Read before commit expires the instance, so building the token needs no reload
+    user_id, role = new_user.id, new_user.role
     db.commit()
 
     # Generate token
-    token = create_access_token({"user_id": new_user.id, "role": new_user.role})
+    token = create_access_token({"user_id": user_id, "role": role})
 
     return Token(
         access_token=token,
-        user_id=new_user.id,
-        role=new_user.role,
+        user_id=user_id,
+        role=role,
     )
 
 
+def _check_login_rate_limit(request: Request, email: str):
+    """Reject with 429 once an IP, or an email from that IP, exceeds the per-minute login attempt budget.
+
+    The email bucket includes the IP, so nobody can lock a victim out by hammering their address.
+    Limitations: counts live in the per-worker cache, so the effective limit scales with the worker
+    count; and behind a reverse proxy request.client is the proxy unless uvicorn runs with
+    --proxy-headers --forwarded-allow-ips=<proxy ip>, which takes the client from X-Forwarded-For.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    for key in (f"login_attempts:ip:{client_ip}", f"login_attempts:email:{email.lower()}:{client_ip}"):
+        if cache.incr(key, 60) > settings.LOGIN_RATE_LIMIT_PER_MINUTE:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts. Please try again in a minute.",
+            )
+
+
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login and get access token."""
+    # Checked before touching the database or the password hasher
+    _check_login_rate_limit(request, user_data.email)
+
     user = db.query(User).filter(User.email == user_data.email).first()
 
     if not user or not verify_password(user_data.password, user.password_hash):
@@ -85,6 +107,11 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
             detail="Account is deactivated. Contact admin.",
         )
 
+    # Upgrade legacy bcrypt (or outdated argon2) hashes now that we have the plaintext
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = hash_password(user_data.password)
+        db.commit()
+
     token = create_access_token({"user_id": user.id, "role": user.role})
 
     return Token(
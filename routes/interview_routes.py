@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timedelta
-import uuid
-from database import get_db
+import secrets
+from database import get_db, strict_loading_options
 from models.user import User, UserProfile
 from models.application import Application
 from models.job import Job
@@ -11,33 +12,80 @@ from models.interview import Interview, InterviewPrep
 from models.recruiter import RecruiterProfile
 from schemas.interview_schemas import InterviewSchedule, InterviewUpdate, InterviewResponse, VideoRoomResponse
 from utils.dependencies import get_current_user, require_role
-from services.notification_service import create_notification
+from services.notification_service import create_notifications_batch
 
 router = APIRouter(prefix="/interviews", tags=["Interviews"])
 
+MEETING_URL_PREFIX = "https://meet.internlink.com/room/"
+
+
+def _interview_details_query(db: Session):
+    """Interviews with their job title and applicant name joined in, one row per interview."""
+    return db.query(Interview, Job.title, UserProfile.full_name).join(
+        Application, Application.id == Interview.application_id
+    ).outerjoin(
+        Job, Job.id == Application.job_id
+    ).outerjoin(
+        UserProfile, UserProfile.user_id == Application.user_id
+    )
+
+
+def _recruiter_id_of(user: User):
+    """Scalar subquery for the recruiter profile id of a user."""
+    return select(RecruiterProfile.id).where(RecruiterProfile.user_id == user.id).scalar_subquery()
+
+
+def _owned_by_recruiter(user: User):
+    """Filter for interviews of the user's recruiter profile; needs Job joined.
+
+    Interviews scheduled before recruiter_id was stored have it NULL and fall back to the job's recruiter.
+    """
+    recruiter_id = _recruiter_id_of(user)
+    return or_(
+        Interview.recruiter_id == recruiter_id,
+        and_(Interview.recruiter_id.is_(None), Job.recruiter_id == recruiter_id),
+    )
+
+
+def _interview_response(interview: Interview, job_title, applicant_name) -> InterviewResponse:
+    return InterviewResponse(
+        id=interview.id, application_id=interview.application_id,
+        scheduled_at=interview.scheduled_at, duration_minutes=interview.duration_minutes,
+        meeting_url=interview.meeting_url, status=interview.status,
+        notes=interview.notes, feedback=interview.feedback, created_at=interview.created_at,
+        applicant_name=applicant_name, job_title=job_title,
+    )
+
 
 @router.post("/schedule", response_model=InterviewResponse, status_code=201)
 def schedule_interview(
     data: InterviewSchedule,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_role("recruiter")),
     db: Session = Depends(get_db)
 ):
     """Schedule an interview for an application."""
-    application = db.query(Application).filter(Application.id == data.application_id).first()
-    if not application:
+    # Application, job, applicant name and the caller's recruiter id in one round-trip
+    row = db.query(
+        Application, Job.title, Job.recruiter_id, UserProfile.full_name,
+        _recruiter_id_of(current_user).label("own_recruiter_id"),
+    ).outerjoin(
+        Job, Job.id == Application.job_id
+    ).outerjoin(
+        UserProfile, UserProfile.user_id == Application.user_id
+    ).filter(Application.id == data.application_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Application not found")
+    application, job_title, job_recruiter_id, applicant_name, recruiter_id = row
 
-    job = db.query(Job).filter(Job.id == application.job_id).first()
-    recruiter = db.query(RecruiterProfile).filter(RecruiterProfile.user_id == current_user.id).first()
-    if not job or job.recruiter_id != recruiter.id:
+    if job_recruiter_id is None or job_recruiter_id != recruiter_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    room_id = uuid.uuid4().hex[:12]
-    meeting_url = f"https://meet.internlink.com/room/{room_id}"
-    meeting_token = uuid.uuid4().hex
+    meeting_url = MEETING_URL_PREFIX + secrets.token_hex(6)
+    meeting_token = secrets.token_urlsafe(24)
 
     interview = Interview(
-        application_id=data.application_id, scheduled_at=data.scheduled_at,
+        application_id=data.application_id, recruiter_id=recruiter_id, scheduled_at=data.scheduled_at,
         duration_minutes=data.duration_minutes, meeting_url=meeting_url,
         meeting_token=meeting_token, notes=data.notes,
     )
@@ -45,51 +93,46 @@ def schedule_interview(
 
     # Update application status
     application.status = "interview_scheduled"
-    db.commit()
-    db.refresh(interview)
 
-    # Notify applicant
-    create_notification(db, application.user_id, "interview_scheduled",
-        "Interview Scheduled",
-        f"Interview scheduled for '{job.title}' on {data.scheduled_at.strftime('%Y-%m-%d %H:%M')}",
-        reference_id=interview.id, reference_type="interview")
+    # Flush assigns the interview id (INSERT ... RETURNING where supported) for the notification
+    db.flush()
 
-    profile = db.query(UserProfile).filter(UserProfile.user_id == application.user_id).first()
-    return InterviewResponse(
-        id=interview.id, application_id=interview.application_id,
-        scheduled_at=interview.scheduled_at, duration_minutes=interview.duration_minutes,
-        meeting_url=interview.meeting_url, status=interview.status,
-        notes=interview.notes, feedback=interview.feedback, created_at=interview.created_at,
-        applicant_name=profile.full_name if profile else None, job_title=job.title,
-    )
+    # Built before commit expires the instance, so no reload is needed
+    response = _interview_response(interview, job_title, applicant_name)
+    applicant_id = application.user_id
+    db.commit()
+
+    # Notify applicant after the response is sent
+    background_tasks.add_task(create_notifications_batch, [{
+        "user_id": applicant_id,
+        "type": "interview_scheduled",
+        "title": "Interview Scheduled",
+        "message": f"Interview scheduled for '{job_title}' on {data.scheduled_at.strftime('%Y-%m-%d %H:%M')}",
+        "reference_id": response.id,
+        "reference_type": "interview",
+    }])
+    return response
 
 
 @router.get("/{interview_id}", response_model=InterviewResponse)
 def get_interview(interview_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get interview details."""
-    interview = db.query(Interview).filter(Interview.id == interview_id).first()
-    if not interview:
+    row = _interview_details_query(db).filter(Interview.id == interview_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Interview not found")
 
-    application = db.query(Application).filter(Application.id == interview.application_id).first()
-    job = db.query(Job).filter(Job.id == application.job_id).first() if application else None
-    profile = db.query(UserProfile).filter(UserProfile.user_id == application.user_id).first() if application else None
-
-    return InterviewResponse(
-        id=interview.id, application_id=interview.application_id,
-        scheduled_at=interview.scheduled_at, duration_minutes=interview.duration_minutes,
-        meeting_url=interview.meeting_url, status=interview.status,
-        notes=interview.notes, feedback=interview.feedback, created_at=interview.created_at,
-        applicant_name=profile.full_name if profile else None,
-        job_title=job.title if job else None,
-    )
+    return _interview_response(*row)
 
 
 @router.put("/{interview_id}", response_model=InterviewResponse)
 def update_interview(interview_id: int, data: InterviewUpdate,
                      current_user: User = Depends(require_role("recruiter")), db: Session = Depends(get_db)):
     """Update interview details."""
-    interview = db.query(Interview).filter(Interview.id == interview_id).first()
+    interview = db.query(Interview).join(
+        Application, Application.id == Interview.application_id
+    ).outerjoin(
+        Job, Job.id == Application.job_id
+    ).filter(Interview.id == interview_id, _owned_by_recruiter(current_user)).first()
     if not interview:
         raise HTTPException(status_code=404, detail="Interview not found")
 
@@ -97,20 +140,9 @@ def update_interview(interview_id: int, data: InterviewUpdate,
     for key, value in update_data.items():
         setattr(interview, key, value)
     db.commit()
-    db.refresh(interview)
 
-    application = db.query(Application).filter(Application.id == interview.application_id).first()
-    job = db.query(Job).filter(Job.id == application.job_id).first() if application else None
-    profile = db.query(UserProfile).filter(UserProfile.user_id == application.user_id).first() if application else None
-
-    return InterviewResponse(
-        id=interview.id, application_id=interview.application_id,
-        scheduled_at=interview.scheduled_at, duration_minutes=interview.duration_minutes,
-        meeting_url=interview.meeting_url, status=interview.status,
-        notes=interview.notes, feedback=interview.feedback, created_at=interview.created_at,
-        applicant_name=profile.full_name if profile else None,
-        job_title=job.title if job else None,
-    )
+    # Reloads the committed interview along with its job title and applicant name
+    return _interview_response(*_interview_details_query(db).filter(Interview.id == interview_id).one())
 
 
 @router.post("/{interview_id}/room", response_model=VideoRoomResponse)
@@ -121,9 +153,9 @@ def create_video_room(interview_id: int, current_user: User = Depends(get_curren
         raise HTTPException(status_code=404, detail="Interview not found")
 
     return VideoRoomResponse(
-        room_id=interview.meeting_token[:12] if interview.meeting_token else uuid.uuid4().hex[:12],
-        meeting_url=interview.meeting_url or f"https://meet.internlink.com/room/{uuid.uuid4().hex[:12]}",
-        token=interview.meeting_token or uuid.uuid4().hex,
+        room_id=interview.meeting_token[:12] if interview.meeting_token else secrets.token_hex(6),
+        meeting_url=interview.meeting_url or MEETING_URL_PREFIX + secrets.token_hex(6),
+        token=interview.meeting_token or secrets.token_urlsafe(24),
         expires_at=interview.scheduled_at + timedelta(hours=2) if interview.scheduled_at else datetime.utcnow() + timedelta(hours=2),
     )
 
@@ -133,31 +165,14 @@ def get_upcoming_interviews(current_user: User = Depends(get_current_user), db:
     """Get upcoming interviews for the current user."""
     now = datetime.utcnow()
 
+    # Ownership is filtered in SQL, not through pre-fetched id lists
     if current_user.role == "recruiter":
-        recruiter = db.query(RecruiterProfile).filter(RecruiterProfile.user_id == current_user.id).first()
-        if not recruiter:
-            return []
-        job_ids = [j.id for j in db.query(Job).filter(Job.recruiter_id == recruiter.id).all()]
-        app_ids = [a.id for a in db.query(Application).filter(Application.job_id.in_(job_ids)).all()] if job_ids else []
-        interviews = db.query(Interview).filter(
-            Interview.application_id.in_(app_ids), Interview.scheduled_at >= now,
-            Interview.status == "scheduled").order_by(Interview.scheduled_at.asc()).all() if app_ids else []
+        owner_filter = _owned_by_recruiter(current_user)
     else:
-        app_ids = [a.id for a in db.query(Application).filter(Application.user_id == current_user.id).all()]
-        interviews = db.query(Interview).filter(
-            Interview.application_id.in_(app_ids), Interview.scheduled_at >= now,
-            Interview.status == "scheduled").order_by(Interview.scheduled_at.asc()).all() if app_ids else []
-
-    result = []
-    for i in interviews:
-        app = db.query(Application).filter(Application.id == i.application_id).first()
-        job = db.query(Job).filter(Job.id == app.job_id).first() if app else None
-        profile = db.query(UserProfile).filter(UserProfile.user_id == app.user_id).first() if app else None
-        result.append(InterviewResponse(
-            id=i.id, application_id=i.application_id, scheduled_at=i.scheduled_at,
-            duration_minutes=i.duration_minutes, meeting_url=i.meeting_url,
-            status=i.status, notes=i.notes, feedback=i.feedback, created_at=i.created_at,
-            applicant_name=profile.full_name if profile else None,
-            job_title=job.title if job else None,
-        ))
-    return result
+        owner_filter = Application.user_id == current_user.id
+
+    interviews = _interview_details_query(db).options(*strict_loading_options()).filter(
+        owner_filter, Interview.scheduled_at >= now, Interview.status == "scheduled"
+    ).order_by(Interview.scheduled_at.asc()).all()
+
+    return [_interview_response(*row) for row in interviews]
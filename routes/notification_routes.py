@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
+from database import get_db, strict_loading_options
 from models.user import User
 from models.notification import Notification
 from schemas.notification_schemas import NotificationResponse, UnreadCountResponse
@@ -21,7 +21,7 @@ def get_notifications(
     db: Session = Depends(get_db)
 ):
     """Get user's notifications."""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    query = db.query(Notification).options(*strict_loading_options()).filter(Notification.user_id == current_user.id)
     if is_read is not None:
         query = query.filter(Notification.is_read == is_read)
     notifications = query.order_by(Notification.created_at.desc()).offset(
@@ -52,7 +52,7 @@ def read_all_notifications(current_user: User = Depends(get_current_user), db: S
 
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, token: str = Query(...), db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     """WebSocket endpoint for real-time notifications."""
     payload = decode_access_token(token)
     if not payload:
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 from database import get_db
 from models.user import User, UserProfile, Resume
@@ -11,22 +11,46 @@ from schemas.job_schemas import JobCreate, JobUpdate, JobResponse
 from schemas.application_schemas import ApplicationStatusUpdate, ApplicationResponse
 from schemas.recruiter_schemas import RecruiterProfileCreate, RecruiterProfileUpdate, RecruiterProfileResponse
 from utils.dependencies import get_current_user, require_role
-from services.analytics_service import get_recruiter_analytics
-from services.notification_service import create_notification
-import os
+from services.analytics_service import (
+    get_recruiter_analytics, invalidate_recruiter_cache,
+    RECRUITER_ANALYTICS_CACHE_KEY, RECRUITER_JOBS_CACHE_KEY,
+)
+from services.cache_service import cache
+from services.search_service import invalidate_job_search, json_array_has_any
+from services.ai_service import invalidate_recommendations
+from utils.file_utils import get_file_response
+from config import settings
+from services.notification_service import create_notifications_batch
 
 router = APIRouter(prefix="/recruiter", tags=["Recruiter"])
 
+# Job attributes JobResponse reads, resolved once at import rather than per row
+_JOB_RESPONSE_FIELDS = tuple(name for name in JobResponse.model_fields if name != "company_name")
+_JOB_RESPONSE_COLUMNS = tuple(getattr(Job, name) for name in _JOB_RESPONSE_FIELDS)
+
+
+def _job_response(job: Job, company_name: Optional[str]) -> JobResponse:
+    """JobResponse straight from a loaded Job; model_construct skips re-validating DB-typed values."""
+    return JobResponse.model_construct(
+        **{name: getattr(job, name) for name in _JOB_RESPONSE_FIELDS}, company_name=company_name
+    )
+
 @router.get("/debug/system-state")
-def debug_system_state(db: Session = Depends(get_db)):
-    return {
-        "users_count": db.query(User).count(),
-        "jobs_count": db.query(Job).count(),
-        "applications_count": db.query(Application).count(),
-        "recruiter_profiles_count": db.query(RecruiterProfile).count(),
-        "all_jobs": [{"id": j.id, "title": j.title, "recruiter_id": j.recruiter_id} for j in db.query(Job).all()],
-        "all_apps": [{"id": a.id, "job_id": a.job_id, "user_id": a.user_id} for a in db.query(Application).all()]
-    }
+def debug_system_state(
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Row counts of the core tables (admin only), fetched in one round-trip."""
+    def count_of(model):
+        return select(func.count()).select_from(model).scalar_subquery()
+
+    row = db.execute(select(
+        count_of(User).label("users_count"),
+        count_of(Job).label("jobs_count"),
+        count_of(Application).label("applications_count"),
+        count_of(RecruiterProfile).label("recruiter_profiles_count"),
+    )).one()
+    return dict(row._mapping)
 
 
 # --- Recruiter Profile ---
@@ -36,9 +60,7 @@ def get_recruiter_profile(
     db: Session = Depends(get_db)
 ):
     """Get recruiter's company profile."""
-    profile = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    profile = current_user.recruiter_profile
     if not profile:
         raise HTTPException(status_code=404, detail="Recruiter profile not found")
     return profile
@@ -51,9 +73,7 @@ def update_recruiter_profile(
     db: Session = Depends(get_db)
 ):
     """Update recruiter's company profile."""
-    profile = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    profile = current_user.recruiter_profile
 
     if not profile:
         raise HTTPException(status_code=404, detail="Recruiter profile not found")
@@ -62,9 +82,16 @@ def update_recruiter_profile(
     for key, value in update_data.items():
         setattr(profile, key, value)
 
+    # Flush fills updated_at; the response is built before commit instead of a refresh SELECT
+    db.flush()
+    response = RecruiterProfileResponse.model_validate(profile)
+    user_id = current_user.id
     db.commit()
-    db.refresh(profile)
-    return profile
+    invalidate_recruiter_cache(user_id)  # cached job list carries company_name
+    if "company_name" in update_data:
+        invalidate_job_search()
+        invalidate_recommendations()
+    return response
 
 
 # --- Job Posting ---
@@ -75,9 +102,7 @@ def create_job(
     db: Session = Depends(get_db)
 ):
     """Post a new job/internship."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    recruiter = current_user.recruiter_profile
     if not recruiter:
         raise HTTPException(status_code=404, detail="Recruiter profile not found. Update your profile first.")
 
@@ -86,13 +111,11 @@ def create_job(
         **job_data.model_dump()
     )
     db.add(job)
+    db.flush()
+    response = _job_response(job, recruiter.company_name)
+    user_id = current_user.id
     db.commit()
-    db.refresh(job)
-
-    response = JobResponse(
-        **{c.name: getattr(job, c.name) for c in job.__table__.columns},
-        company_name=recruiter.company_name,
-    )
+    invalidate_recruiter_cache(user_id)
     return response
 
 
@@ -101,24 +124,22 @@ def get_my_jobs(
     current_user: User = Depends(require_role("recruiter")),
     db: Session = Depends(get_db)
 ):
-    """Get all jobs posted by the recruiter."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
-    if not recruiter:
-        return []
-
-    jobs = db.query(Job).filter(
-        Job.recruiter_id == recruiter.id
-    ).order_by(Job.created_at.desc()).all()
-
-    return [
-        JobResponse(
-            **{c.name: getattr(j, c.name) for c in j.__table__.columns},
-            company_name=recruiter.company_name,
-        )
-        for j in jobs
-    ]
+    """Get all jobs posted by the recruiter (cached briefly per recruiter)."""
+    cache_key = RECRUITER_JOBS_CACHE_KEY.format(user_id=current_user.id)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Plain rows of just the response columns, no ORM objects to hydrate
+    rows = db.execute(
+        select(*_JOB_RESPONSE_COLUMNS, RecruiterProfile.company_name)
+        .join(RecruiterProfile, RecruiterProfile.id == Job.recruiter_id)
+        .where(RecruiterProfile.user_id == current_user.id)
+        .order_by(Job.created_at.desc())
+    ).mappings().all()
+    result = [JobResponse.model_construct(**row) for row in rows]
+    cache.set(cache_key, result, settings.RECRUITER_JOBS_CACHE_TTL_SECONDS)
+    return result
 
 
 @router.put("/jobs/{job_id}", response_model=JobResponse)
@@ -129,12 +150,10 @@ def update_job(
     db: Session = Depends(get_db)
 ):
     """Update a job posting."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    recruiter = current_user.recruiter_profile
     job = db.query(Job).filter(
         Job.id == job_id, Job.recruiter_id == recruiter.id
-    ).first()
+    ).first() if recruiter else None
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -143,16 +162,64 @@ def update_job(
     for key, value in update_data.items():
         setattr(job, key, value)
 
+    db.flush()
+    response = _job_response(job, recruiter.company_name)
+    user_id = current_user.id
     db.commit()
-    db.refresh(job)
+    invalidate_recruiter_cache(user_id)
+    invalidate_job_search()
+    invalidate_recommendations()  # a closed or re-skilled job must leave everyone's recommendations
+    return response
+
 
-    return JobResponse(
-        **{c.name: getattr(job, c.name) for c in job.__table__.columns},
-        company_name=recruiter.company_name,
+# --- Applicants ---
+def _owned_job(db: Session, job_id: int, user: User) -> Optional[Job]:
+    """The job if it belongs to the user's recruiter profile, in one query joining the profile."""
+    return db.query(Job).join(RecruiterProfile, RecruiterProfile.id == Job.recruiter_id).filter(
+        Job.id == job_id, RecruiterProfile.user_id == user.id
+    ).first()
+
+
+def _applicant_response(app: Application, job_title: str) -> ApplicationResponse:
+    """ApplicationResponse from an application with user, profile and resume already loaded."""
+    user = app.user
+    profile = user.profile if user else None
+    resume = app.resume
+
+    # Combine skills from profile and resume
+    skills = set()
+    if profile and profile.skills:
+        skills.update(profile.skills)
+    if resume and resume.parsed_skills:
+        skills.update(resume.parsed_skills)
+
+    return ApplicationResponse(
+        id=app.id,
+        user_id=app.user_id,
+        job_id=app.job_id,
+        resume_id=app.resume_id,
+        cover_letter=app.cover_letter,
+        status=app.status,
+        matching_score=app.matching_score,
+        applied_at=app.applied_at,
+        updated_at=app.updated_at,
+        job_title=job_title,
+        applicant_name=profile.full_name if profile else None,
+        applicant_email=user.email if user else None,
+        skills=list(skills),
+        education=profile.education if profile else [],
+        experience=profile.experience if profile else []
+    )
+
+
+def _applicant_load_options() -> tuple:
+    """Load the applicant, their profile and resume in the same query as the application."""
+    return (
+        joinedload(Application.user).joinedload(User.profile),
+        joinedload(Application.resume),
     )
 
 
-# --- Applicants ---
 @router.get("/jobs/{job_id}/applicants", response_model=List[ApplicationResponse])
 def get_applicants(
     job_id: int,
@@ -160,52 +227,16 @@ def get_applicants(
     db: Session = Depends(get_db)
 ):
     """View all applicants for a specific job."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
-    job = db.query(Job).filter(
-        Job.id == job_id, Job.recruiter_id == recruiter.id
-    ).first()
+    job = _owned_job(db, job_id, current_user)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    applications = db.query(Application).filter(
+    applications = db.query(Application).options(*_applicant_load_options()).filter(
         Application.job_id == job_id
     ).order_by(Application.matching_score.desc().nullslast()).all()
 
-    result = []
-    for app in applications:
-        user = db.query(User).filter(User.id == app.user_id).first()
-        profile = db.query(UserProfile).filter(UserProfile.user_id == app.user_id).first()
-        resume = db.query(Resume).filter(Resume.id == app.resume_id).first() if app.resume_id else None
-        
-        # Combine skills from profile and resume
-        skills = set()
-        if profile and profile.skills:
-            skills.update(profile.skills)
-        if resume and resume.parsed_skills:
-            skills.update(resume.parsed_skills)
-
-        result.append(ApplicationResponse(
-            id=app.id,
-            user_id=app.user_id,
-            job_id=app.job_id,
-            resume_id=app.resume_id,
-            cover_letter=app.cover_letter,
-            status=app.status,
-            matching_score=app.matching_score,
-            applied_at=app.applied_at,
-            updated_at=app.updated_at,
-            job_title=job.title,
-            applicant_name=profile.full_name if profile else None,
-            applicant_email=user.email if user else None,
-            skills=list(skills),
-            education=profile.education if profile else [],
-            experience=profile.experience if profile else []
-        ))
-
-    return result
+    return [_applicant_response(app, job.title) for app in applications]
 
 
 @router.get("/applicants", response_model=List[ApplicationResponse])
@@ -214,55 +245,20 @@ def get_all_applicants(
     db: Session = Depends(get_db)
 ):
     """View all applicants for all jobs posted by the recruiter."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    recruiter = current_user.recruiter_profile
     if not recruiter:
         return []
 
-    # Get all jobs by this recruiter
-    job_ids = [j.id for j in db.query(Job.id).filter(Job.recruiter_id == recruiter.id).all()]
-    
-    if not job_ids:
+    # Titles of all jobs by this recruiter, fetched once and looked up per application
+    job_titles = dict(db.query(Job.id, Job.title).filter(Job.recruiter_id == recruiter.id).all())
+    if not job_titles:
         return []
 
-    applications = db.query(Application).filter(
-        Application.job_id.in_(job_ids)
+    applications = db.query(Application).options(*_applicant_load_options()).filter(
+        Application.job_id.in_(job_titles)
     ).order_by(Application.applied_at.desc()).all()
 
-    result = []
-    for app in applications:
-        user = db.query(User).filter(User.id == app.user_id).first()
-        profile = db.query(UserProfile).filter(UserProfile.user_id == app.user_id).first()
-        resume = db.query(Resume).filter(Resume.id == app.resume_id).first() if app.resume_id else None
-        job = db.query(Job).filter(Job.id == app.job_id).first()
-
-        # Combine skills from profile and resume
-        skills = set()
-        if profile and profile.skills:
-            skills.update(profile.skills)
-        if resume and resume.parsed_skills:
-            skills.update(resume.parsed_skills)
-
-        result.append(ApplicationResponse(
-            id=app.id,
-            user_id=app.user_id,
-            job_id=app.job_id,
-            resume_id=app.resume_id,
-            cover_letter=app.cover_letter,
-            status=app.status,
-            matching_score=app.matching_score,
-            applied_at=app.applied_at,
-            updated_at=app.updated_at,
-            job_title=job.title if job else "Unknown",
-            applicant_name=profile.full_name if profile else None,
-            applicant_email=user.email if user else None,
-            skills=list(skills),
-            education=profile.education if profile else [],
-            experience=profile.experience if profile else []
-        ))
-
-    return result
+    return [_applicant_response(app, job_titles.get(app.job_id, "Unknown")) for app in applications]
 
 
 @router.get("/jobs/{job_id}/applicants/filter", response_model=List[ApplicationResponse])
@@ -273,53 +269,25 @@ def filter_applicants_by_skills(
     db: Session = Depends(get_db)
 ):
     """Filter applicants by skills."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
-    job = db.query(Job).filter(
-        Job.id == job_id, Job.recruiter_id == recruiter.id
-    ).first()
+    job = _owned_job(db, job_id, current_user)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    required_skills = [s.strip().lower() for s in skills.split(",")]
+    required_skills = sorted({s.strip().lower() for s in skills.split(",") if s.strip()})
+    if not required_skills:
+        return []
 
-    applications = db.query(Application).filter(
-        Application.job_id == job_id
+    # Skill match runs in SQL against the resume's parsed skills and the profile skills
+    applications = db.query(Application).options(*_applicant_load_options()).filter(
+        Application.job_id == job_id,
+        or_(
+            Application.resume.has(json_array_has_any(db, Resume.parsed_skills, required_skills)),
+            Application.user.has(User.profile.has(json_array_has_any(db, UserProfile.skills, required_skills))),
+        ),
     ).all()
 
-    filtered = []
-    for app in applications:
-        resume = db.query(Resume).filter(Resume.id == app.resume_id).first() if app.resume_id else None
-        profile = db.query(UserProfile).filter(UserProfile.user_id == app.user_id).first()
-
-        # Check skills from resume or profile
-        user_skills = set()
-        if resume and resume.parsed_skills:
-            user_skills.update(s.lower() for s in resume.parsed_skills)
-        if profile and profile.skills:
-            user_skills.update(s.lower() for s in profile.skills)
-
-        # Check if user has at least one required skill
-        if any(skill in user_skills for skill in required_skills):
-            user = db.query(User).filter(User.id == app.user_id).first()
-            filtered.append(ApplicationResponse(
-                id=app.id,
-                user_id=app.user_id,
-                job_id=app.job_id,
-                resume_id=app.resume_id,
-                cover_letter=app.cover_letter,
-                status=app.status,
-                matching_score=app.matching_score,
-                applied_at=app.applied_at,
-                updated_at=app.updated_at,
-                job_title=job.title,
-                applicant_name=profile.full_name if profile else None,
-                applicant_email=user.email if user else None,
-            ))
-
-    return filtered
+    return [_applicant_response(app, job.title) for app in applications]
 
 
 # --- Resume Download ---
@@ -336,24 +304,18 @@ def download_resume(
 
     # Verify recruiter owns the job
     job = db.query(Job).filter(Job.id == application.job_id).first()
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
-    if not job or job.recruiter_id != recruiter.id:
+    recruiter = current_user.recruiter_profile
+    if not job or not recruiter or job.recruiter_id != recruiter.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
     if not application.resume_id:
         raise HTTPException(status_code=404, detail="No resume attached to this application")
 
     resume = db.query(Resume).filter(Resume.id == application.resume_id).first()
-    if not resume or not os.path.exists(resume.file_path):
+    response = get_file_response(resume.file_path, resume.filename, resume.content_type) if resume else None
+    if response is None:
         raise HTTPException(status_code=404, detail="Resume file not found")
-
-    return FileResponse(
-        path=resume.file_path,
-        filename=resume.filename,
-        media_type="application/octet-stream",
-    )
+    return response
 
 
 # --- Change Status ---
@@ -361,6 +323,7 @@ def download_resume(
 def change_application_status(
     application_id: int,
     status_update: ApplicationStatusUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_role("recruiter")),
     db: Session = Depends(get_db)
 ):
@@ -378,17 +341,14 @@ def change_application_status(
 
     # Verify recruiter owns the job
     job = db.query(Job).filter(Job.id == application.job_id).first()
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
-    if not job or job.recruiter_id != recruiter.id:
+    recruiter = current_user.recruiter_profile
+    if not job or not recruiter or job.recruiter_id != recruiter.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
     old_status = application.status
     application.status = status_update.status
-    db.commit()
 
-    # Record status history
+    # Status change and history row go out in one commit
     history = ApplicationStatusHistory(
         application_id=application.id,
         old_status=old_status,
@@ -397,17 +357,20 @@ def change_application_status(
         notes=status_update.notes,
     )
     db.add(history)
-    db.commit()
 
-    # Notify applicant
-    create_notification(
-        db, application.user_id, "application_update",
-        "Application Status Updated",
-        f"Your application for '{job.title}' has been updated to: {status_update.status}",
-        reference_id=application.id, reference_type="application",
-    )
-
-    return ApplicationResponse(
+    # Notify applicant once the response is sent
+    background_tasks.add_task(create_notifications_batch, [{
+        "user_id": application.user_id,
+        "type": "application_update",
+        "title": "Application Status Updated",
+        "message": f"Your application for '{job.title}' has been updated to: {status_update.status}",
+        "reference_id": application.id,
+        "reference_type": "application",
+    }])
+
+    # Flush sets updated_at; build the response before commit expires the instances
+    db.flush()
+    response = ApplicationResponse(
         id=application.id,
         user_id=application.user_id,
         job_id=application.job_id,
@@ -419,6 +382,11 @@ def change_application_status(
         updated_at=application.updated_at,
         job_title=job.title,
     )
+    recruiter_user_id = current_user.id
+    db.commit()
+    invalidate_recruiter_cache(recruiter_user_id)
+
+    return response
 
 
 # --- Analytics ---
@@ -427,11 +395,16 @@ def recruiter_analytics(
     current_user: User = Depends(require_role("recruiter")),
     db: Session = Depends(get_db)
 ):
-    """Get recruiter's analytics dashboard data."""
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.user_id == current_user.id
-    ).first()
+    """Get recruiter's analytics dashboard data (cached briefly per recruiter)."""
+    cache_key = RECRUITER_ANALYTICS_CACHE_KEY.format(user_id=current_user.id)
+    analytics = cache.get(cache_key)
+    if analytics is not None:
+        return analytics
+
+    recruiter = current_user.recruiter_profile
     if not recruiter:
         raise HTTPException(status_code=404, detail="Recruiter profile not found")
 
-    return get_recruiter_analytics(db, recruiter.id)
+    analytics = get_recruiter_analytics(db, recruiter.id)
+    cache.set(cache_key, analytics, settings.ANALYTICS_CACHE_TTL_SECONDS)
+    return analytics
@@ -1,166 +1,243 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from sqlalchemy import and_, case, exists, func, or_, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models.user import User, UserProfile
 from models.social import Post, Comment, Like, Share, Follow
 from schemas.social_schemas import PostCreate, PostResponse, CommentCreate, CommentResponse, FollowResponse, FollowStatsResponse
 from utils.dependencies import get_current_user
-from services.notification_service import create_notification
+from services.notification_service import create_notifications_batch
+from services.cache_service import cache
+from config import settings
+import time
 
 router = APIRouter(prefix="/social", tags=["Social"])
 
+# Explore pages carry the viewer's is_liked, follow stats the viewer's is_following
+EXPLORE_CACHE_PREFIX = "social_explore:"
+FOLLOW_STATS_CACHE_PREFIX = "follow_stats:"
+# Per-user generation baked into those keys; other viewers' entries just age out with the short TTL
+SOCIAL_CACHE_VERSION_KEY = "social_cache_version:{user_id}"
 
-def _build_post_response(post, db, current_user_id):
-    profile = db.query(UserProfile).filter(UserProfile.user_id == post.user_id).first()
-    user = db.query(User).filter(User.id == post.user_id).first()
+
+def _cache_version(user_id: int) -> int:
+    return cache.get(SOCIAL_CACHE_VERSION_KEY.format(user_id=user_id)) or 0
+
+
+def _bump_cache_version(*user_ids: int):
+    """Retire the cached social entries keyed on these users, without scanning the cache."""
+    for user_id in user_ids:
+        # Outlives every entry keyed on the old generation, so a lapsed version can't revive one
+        cache.set(SOCIAL_CACHE_VERSION_KEY.format(user_id=user_id), time.monotonic_ns(),
+                  settings.SOCIAL_CACHE_TTL_SECONDS * 2)
+
+
+def _actor_name(db, user):
+    """Name shown in notifications about the user's actions: profile name, else email."""
+    profile = db.query(UserProfile.id, UserProfile.full_name).filter(UserProfile.user_id == user.id).first()
+    return profile.full_name if profile else user.email
+
+
+def _notify_later(background_tasks, user_id, notification_type, title, message, reference_id, reference_type):
+    """Queue a notification insert (and WebSocket push) to run after the response is sent."""
+    background_tasks.add_task(create_notifications_batch, [{
+        "user_id": user_id, "type": notification_type, "title": title, "message": message,
+        "reference_id": reference_id, "reference_type": reference_type,
+    }])
+
+
+def _post_rows_query(db, current_user_id):
+    """Posts with author name and like/comment/share counts computed in the same SELECT."""
+    def count_of(model):
+        return select(func.count(model.id)).where(model.post_id == Post.id).correlate(Post).scalar_subquery()
+
+    is_liked = exists().where(Like.post_id == Post.id, Like.user_id == current_user_id)
+    return db.query(
+        Post, UserProfile.id, UserProfile.full_name, User.email,
+        count_of(Like), count_of(Comment), count_of(Share), is_liked,
+    ).outerjoin(User, User.id == Post.user_id).outerjoin(UserProfile, UserProfile.user_id == Post.user_id)
+
+
+def _post_response(row):
+    post, profile_id, full_name, email, likes, comments, shares, is_liked = row
     return PostResponse(
         id=post.id, user_id=post.user_id, content=post.content,
         media_url=post.media_url, created_at=post.created_at,
-        author_name=profile.full_name if profile else (user.email if user else "Unknown"),
-        likes_count=db.query(Like).filter(Like.post_id == post.id).count(),
-        comments_count=db.query(Comment).filter(Comment.post_id == post.id).count(),
-        shares_count=db.query(Share).filter(Share.post_id == post.id).count(),
-        is_liked=db.query(Like).filter(Like.post_id == post.id, Like.user_id == current_user_id).first() is not None,
+        author_name=full_name if profile_id else (email or "Unknown"),
+        likes_count=likes, comments_count=comments, shares_count=shares,
+        is_liked=bool(is_liked),
     )
 
 
 @router.post("/posts", response_model=PostResponse, status_code=201)
 def create_post(post_data: PostCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    post = Post(user_id=current_user.id, content=post_data.content, media_url=post_data.media_url)
-    db.add(post); db.commit(); db.refresh(post)
-    return _build_post_response(post, db, current_user.id)
+    user_id = current_user.id
+    post = Post(user_id=user_id, content=post_data.content, media_url=post_data.media_url)
+    db.add(post); db.commit()
+    _bump_cache_version(user_id)
+    return _post_response(_post_rows_query(db, user_id).filter(Post.id == post.id).one())
 
 
 @router.get("/posts", response_model=List[PostResponse])
 def get_feed(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
+             before_id: Optional[int] = Query(None, description="Return posts older than this post id (keyset cursor)"),
              current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    following_ids = [f.following_id for f in db.query(Follow).filter(Follow.follower_id == current_user.id).all()]
-    following_ids.append(current_user.id)
-    posts = db.query(Post).filter(Post.user_id.in_(following_ids)).order_by(
-        Post.created_at.desc()).offset((page-1)*page_size).limit(page_size).all()
-    return [_build_post_response(p, db, current_user.id) for p in posts]
+    # Followed users come from a subquery on Follow, never a Python id list
+    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == current_user.id)
+    query = _post_rows_query(db, current_user.id).filter(
+        or_(Post.user_id == current_user.id, Post.user_id.in_(following_ids.scalar_subquery()))
+    ).order_by(Post.created_at.desc(), Post.id.desc())
+    if before_id is not None:
+        cursor_created_at = select(Post.created_at).where(Post.id == before_id).scalar_subquery()
+        query = query.filter(or_(
+            Post.created_at < cursor_created_at,
+            and_(Post.created_at == cursor_created_at, Post.id < before_id),
+        ))
+    else:
+        query = query.offset((page-1)*page_size)
+    return [_post_response(r) for r in query.limit(page_size).all()]
 
 
 @router.get("/posts/explore", response_model=List[PostResponse])
 def explore_posts(page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=50),
                   current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    posts = db.query(Post).order_by(Post.created_at.desc()).offset((page-1)*page_size).limit(page_size).all()
-    return [_build_post_response(p, db, current_user.id) for p in posts]
+    cache_key = f"{EXPLORE_CACHE_PREFIX}{current_user.id}:{_cache_version(current_user.id)}:{page}:{page_size}"
+    result = cache.get(cache_key)
+    if result is None:
+        rows = _post_rows_query(db, current_user.id).order_by(
+            Post.created_at.desc()).offset((page-1)*page_size).limit(page_size).all()
+        result = [_post_response(r) for r in rows]
+        cache.set(cache_key, result, settings.SOCIAL_CACHE_TTL_SECONDS)
+    return result
 
 
 @router.post("/posts/{post_id}/comment", response_model=CommentResponse)
-def add_comment(post_id: int, comment_data: CommentCreate,
+def add_comment(post_id: int, comment_data: CommentCreate, background_tasks: BackgroundTasks,
                 current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post: raise HTTPException(status_code=404, detail="Post not found")
-    comment = Comment(post_id=post_id, user_id=current_user.id, content=comment_data.content)
-    db.add(comment); db.commit(); db.refresh(comment)
-    if post.user_id != current_user.id:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        create_notification(db, post.user_id, "new_comment", "New Comment",
-            f"{profile.full_name if profile else current_user.email} commented on your post",
-            reference_id=post_id, reference_type="post")
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    return CommentResponse(id=comment.id, post_id=comment.post_id, user_id=comment.user_id,
-        content=comment.content, created_at=comment.created_at,
-        author_name=profile.full_name if profile else current_user.email)
+    actor_id, actor_name, owner_id = current_user.id, _actor_name(db, current_user), post.user_id
+    comment = Comment(post_id=post_id, user_id=actor_id, content=comment_data.content)
+    db.add(comment); db.flush()
+    response = CommentResponse(id=comment.id, post_id=comment.post_id, user_id=comment.user_id,
+        content=comment.content, created_at=comment.created_at, author_name=actor_name)
+    db.commit()
+    _bump_cache_version(actor_id)
+    if owner_id != actor_id:
+        _notify_later(background_tasks, owner_id, "new_comment", "New Comment",
+            f"{actor_name} commented on your post", post_id, "post")
+    return response
 
 
 @router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
 def get_comments(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.asc()).all()
-    result = []
-    for c in comments:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == c.user_id).first()
-        user = db.query(User).filter(User.id == c.user_id).first()
-        result.append(CommentResponse(id=c.id, post_id=c.post_id, user_id=c.user_id,
+    # Author email and profile name ride along on each comment row
+    rows = db.query(Comment, UserProfile.id, UserProfile.full_name, User.email).outerjoin(
+        User, User.id == Comment.user_id).outerjoin(UserProfile, UserProfile.user_id == Comment.user_id).filter(
+        Comment.post_id == post_id).order_by(Comment.created_at.asc()).all()
+    return [
+        CommentResponse(id=c.id, post_id=c.post_id, user_id=c.user_id,
             content=c.content, created_at=c.created_at,
-            author_name=profile.full_name if profile else (user.email if user else "Unknown")))
-    return result
+            author_name=full_name if profile_id else (email or "Unknown"))
+        for c, profile_id, full_name, email in rows
+    ]
 
 
 @router.post("/posts/{post_id}/like")
-def toggle_like(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def toggle_like(post_id: int, background_tasks: BackgroundTasks,
+                current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post: raise HTTPException(status_code=404, detail="Post not found")
-    existing = db.query(Like).filter(Like.post_id == post_id, Like.user_id == current_user.id).first()
-    if existing:
-        db.delete(existing); db.commit()
+    # Unlike is a DELETE whose rowcount doubles as the "already liked" check
+    actor_id, owner_id = current_user.id, post.user_id
+    if db.query(Like).filter(Like.post_id == post_id, Like.user_id == actor_id).delete(synchronize_session=False):
+        db.commit()
+        _bump_cache_version(actor_id)
         return {"message": "Post unliked", "liked": False}
-    like = Like(post_id=post_id, user_id=current_user.id)
+    actor_name = _actor_name(db, current_user) if owner_id != actor_id else None
+    like = Like(post_id=post_id, user_id=actor_id)
     db.add(like); db.commit()
-    if post.user_id != current_user.id:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        create_notification(db, post.user_id, "new_like", "New Like",
-            f"{profile.full_name if profile else current_user.email} liked your post",
-            reference_id=post_id, reference_type="post")
+    _bump_cache_version(actor_id)
+    if owner_id != actor_id:
+        _notify_later(background_tasks, owner_id, "new_like", "New Like",
+            f"{actor_name} liked your post", post_id, "post")
     return {"message": "Post liked", "liked": True}
 
 
 @router.post("/posts/{post_id}/share")
-def share_post(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def share_post(post_id: int, background_tasks: BackgroundTasks,
+               current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post: raise HTTPException(status_code=404, detail="Post not found")
-    share = Share(post_id=post_id, user_id=current_user.id)
+    actor_id, owner_id = current_user.id, post.user_id
+    actor_name = _actor_name(db, current_user) if owner_id != actor_id else None
+    share = Share(post_id=post_id, user_id=actor_id)
     db.add(share); db.commit()
-    if post.user_id != current_user.id:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        create_notification(db, post.user_id, "new_share", "Post Shared",
-            f"{profile.full_name if profile else current_user.email} shared your post",
-            reference_id=post_id, reference_type="post")
+    _bump_cache_version(actor_id)
+    if owner_id != actor_id:
+        _notify_later(background_tasks, owner_id, "new_share", "Post Shared",
+            f"{actor_name} shared your post", post_id, "post")
     return {"message": "Post shared successfully"}
 
 
 @router.post("/users/{user_id}/follow")
-def toggle_follow(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def toggle_follow(user_id: int, background_tasks: BackgroundTasks,
+                  current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id == current_user.id: raise HTTPException(status_code=400, detail="Cannot follow yourself")
-    target = db.query(User).filter(User.id == user_id).first()
-    if not target: raise HTTPException(status_code=404, detail="User not found")
-    existing = db.query(Follow).filter(Follow.follower_id == current_user.id, Follow.following_id == user_id).first()
-    if existing:
-        db.delete(existing); db.commit()
+    actor_id, actor_email = current_user.id, current_user.email
+    # Target existence, follow state and the actor's profile name in one round-trip
+    row = db.query(
+        User.id, UserProfile.id, UserProfile.full_name,
+        exists().where(Follow.follower_id == actor_id, Follow.following_id == user_id),
+    ).outerjoin(UserProfile, UserProfile.user_id == actor_id).filter(User.id == user_id).first()
+    if not row: raise HTTPException(status_code=404, detail="User not found")
+    _, profile_id, full_name, is_following = row
+    if is_following:
+        db.query(Follow).filter(Follow.follower_id == actor_id, Follow.following_id == user_id).delete(
+            synchronize_session=False)
+        db.commit()
+        _bump_cache_version(actor_id, user_id)
         return {"message": "Unfollowed", "following": False}
-    follow = Follow(follower_id=current_user.id, following_id=user_id)
-    db.add(follow); db.commit()
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    create_notification(db, user_id, "new_follower", "New Follower",
-        f"{profile.full_name if profile else current_user.email} started following you",
-        reference_id=current_user.id, reference_type="user")
+    db.add(Follow(follower_id=actor_id, following_id=user_id)); db.commit()
+    _bump_cache_version(actor_id, user_id)
+    _notify_later(background_tasks, user_id, "new_follower", "New Follower",
+        f"{full_name if profile_id else actor_email} started following you", actor_id, "user")
     return {"message": "Following", "following": True}
 
 
+def _follow_rows(db: Session, match_column, user_column, user_id: int):
+    """Follow rows matching user_id on match_column, with the other side's email and name joined in."""
+    return db.query(Follow.id, User.id, User.email, UserProfile.full_name).join(
+        User, User.id == user_column).outerjoin(UserProfile, UserProfile.user_id == user_column).filter(
+        match_column == user_id).all()
+
+
 @router.get("/users/{user_id}/followers", response_model=List[FollowResponse])
 def get_followers(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    follows = db.query(Follow).filter(Follow.following_id == user_id).all()
-    result = []
-    for f in follows:
-        user = db.query(User).filter(User.id == f.follower_id).first()
-        profile = db.query(UserProfile).filter(UserProfile.user_id == f.follower_id).first()
-        if user:
-            result.append(FollowResponse(id=f.id, user_id=user.id,
-                full_name=profile.full_name if profile else None, email=user.email))
-    return result
+    return [FollowResponse(id=follow_id, user_id=uid, full_name=full_name, email=email)
+            for follow_id, uid, email, full_name in _follow_rows(db, Follow.following_id, Follow.follower_id, user_id)]
 
 
 @router.get("/users/{user_id}/following", response_model=List[FollowResponse])
 def get_following(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    follows = db.query(Follow).filter(Follow.follower_id == user_id).all()
-    result = []
-    for f in follows:
-        user = db.query(User).filter(User.id == f.following_id).first()
-        profile = db.query(UserProfile).filter(UserProfile.user_id == f.following_id).first()
-        if user:
-            result.append(FollowResponse(id=f.id, user_id=user.id,
-                full_name=profile.full_name if profile else None, email=user.email))
-    return result
+    return [FollowResponse(id=follow_id, user_id=uid, full_name=full_name, email=email)
+            for follow_id, uid, email, full_name in _follow_rows(db, Follow.follower_id, Follow.following_id, user_id)]
 
 
 @router.get("/users/{user_id}/follow-stats", response_model=FollowStatsResponse)
 def get_follow_stats(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return FollowStatsResponse(
-        followers_count=db.query(Follow).filter(Follow.following_id == user_id).count(),
-        following_count=db.query(Follow).filter(Follow.follower_id == user_id).count(),
-        is_following=db.query(Follow).filter(
-            Follow.follower_id == current_user.id, Follow.following_id == user_id).first() is not None,
-    )
+    cache_key = f"{FOLLOW_STATS_CACHE_PREFIX}{current_user.id}:{user_id}:{_cache_version(user_id)}"
+    stats = cache.get(cache_key)
+    if stats is None:
+        # All three stats from one pass over the user's follow rows via conditional aggregation
+        followers, following, is_following = db.query(
+            func.count(Follow.id).filter(Follow.following_id == user_id),
+            func.count(Follow.id).filter(Follow.follower_id == user_id),
+            func.max(case((Follow.follower_id == current_user.id, 1), else_=0)).filter(Follow.following_id == user_id),
+        ).filter(or_(Follow.following_id == user_id, Follow.follower_id == user_id)).one()
+        stats = FollowStatsResponse(
+            followers_count=followers, following_count=following, is_following=bool(is_following),
+        )
+        cache.set(cache_key, stats, settings.SOCIAL_CACHE_TTL_SECONDS)
+    return stats
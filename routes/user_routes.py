@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Query
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
-from database import get_db
+from database import SessionLocal, get_db, row_exists
 from models.user import User, UserProfile, Resume
 from models.job import Job
 from models.application import Application, ApplicationStatusHistory
-from models.recruiter import RecruiterProfile
 from schemas.user_schemas import UserProfileCreate, UserProfileUpdate, UserProfileResponse, UserResponse, ResumeResponse
 from schemas.application_schemas import ApplicationCreate, ApplicationResponse, ApplicationTrackingResponse, StatusHistoryResponse
 from utils.dependencies import get_current_user, require_role
-from services.resume_service import (
-    save_resume, 
-    extract_skills_from_text, 
-    parse_resume_text, 
-    extract_education_from_text, 
-    extract_experience_from_text
-)
-from services.search_service import search_jobs
+from services.resume_service import parse_resume_text, extract_resume_details
+from services.search_service import search_jobs, job_search_cache_key
+from services.cache_service import cache
+from services.ai_service import invalidate_user_skills, invalidate_recommendations
 from services.notification_service import create_notification
+from services.analytics_service import invalidate_recruiter_cache
+from utils.file_utils import save_upload_file
+from config import settings
+import asyncio
+import logging
+import mimetypes
 import os
 
 router = APIRouter(prefix="/users", tags=["Users"])
+logger = logging.getLogger(__name__)
 
 
 # --- Profile ---
@@ -47,19 +49,101 @@ def update_profile(
     for key, value in update_data.items():
         setattr(profile, key, value)
 
+    # Flush assigns id/timestamps; the response is built before commit instead of a refresh SELECT
+    db.flush()
+    response = UserProfileResponse.model_validate(profile)
+    user_id = current_user.id
     db.commit()
-    db.refresh(profile)
-    return profile
+    invalidate_user_skills(user_id)
+    return response
 
 
 # --- Resume ---
-@router.post("/resume/upload", response_model=ResumeResponse)
+def _parse_resume(file_path: str) -> tuple:
+    """Extract (text, skills, education, experience) from a saved resume; CPU-bound, run in a thread."""
+    parsed_text = parse_resume_text(file_path)
+    return (parsed_text, *extract_resume_details(parsed_text))
+
+
+def _create_pending_resume(user_id: int, filename: str, saved: dict) -> ResumeResponse:
+    """Save the resume row as the user's primary, unparsed; parsing fills it in later.
+
+    Runs in a worker thread, so it opens its own session instead of borrowing the request's.
+    """
+    with SessionLocal() as db:
+        # Set existing resumes as non-primary
+        db.query(Resume).filter(
+            Resume.user_id == user_id
+        ).update({"is_primary": False})
+
+        resume = Resume(
+            user_id=user_id,
+            filename=filename,
+            file_path=saved["file_path"],
+            file_size=saved["file_size"],
+            content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            parsed_skills=[],
+            parse_status="pending",
+            is_primary=True,
+        )
+        db.add(resume)
+        db.flush()
+        response = ResumeResponse.model_validate(resume)
+        db.commit()
+        return response
+
+
+def _parse_and_store_resume(resume_id: int):
+    """Background task: parse a pending resume and merge its skills, education and experience into the profile."""
+    db = SessionLocal()
+    try:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume:
+            return
+        try:
+            parsed_text, parsed_skills, extracted_edu, extracted_exp = _parse_resume(resume.file_path)
+        except Exception:
+            logger.exception("Parsing resume %s failed", resume_id)
+            resume.parse_status = "failed"
+            db.commit()
+            return
+
+        resume.parsed_text = parsed_text
+        resume.parsed_skills = parsed_skills
+        resume.parse_status = "done"
+
+        # Update user profile automatically from resume
+        user_id = resume.user_id
+        profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+        if not profile:
+            profile = UserProfile(user_id=user_id)
+            db.add(profile)
+
+        # Update skills
+        existing_skills = [s.lower() for s in (profile.skills or [])]
+        new_skills = [s for s in parsed_skills if s.lower() not in existing_skills]
+        profile.skills = (profile.skills or []) + new_skills
+
+        # Update education and experience from resume
+        if extracted_edu:
+            profile.education = extracted_edu
+
+        if extracted_exp:
+            profile.experience = extracted_exp
+
+        db.commit()
+        invalidate_user_skills(user_id)
+    finally:
+        db.close()
+
+
+@router.post("/resume/upload", response_model=ResumeResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_resume(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
 ):
-    """Upload a resume file."""
+    """Upload a resume file; it is parsed in the background (poll /resume/{id}/status)."""
     # Validate file extension
     ext = os.path.splitext(file.filename)[1].lower()
     allowed = [".pdf", ".doc", ".docx", ".txt"]
@@ -69,60 +153,32 @@ async def upload_resume(
             detail=f"File type not allowed. Allowed: {', '.join(allowed)}"
         )
 
-    # Read file content
-    content = await file.read()
-
-    # Save file
-    file_path = save_resume(content, file.filename, current_user.id)
+    # Stream to disk rather than holding the whole upload in memory
+    saved = await save_upload_file(
+        file, "resumes", max_bytes=settings.MAX_RESUME_SIZE_MB * 1024 * 1024
+    )
 
-    # Parse resume for skills, education, and experience
-    parsed_text = parse_resume_text(file_path)
-    parsed_skills = extract_skills_from_text(parsed_text)
-    extracted_edu = extract_education_from_text(parsed_text)
-    extracted_exp = extract_experience_from_text(parsed_text)
+    # Blocking DB write runs in a worker thread; parsing runs after the response is sent
+    response = await asyncio.to_thread(_create_pending_resume, current_user.id, file.filename, saved)
+    background_tasks.add_task(_parse_and_store_resume, response.id)
+    return response
 
-    # Set existing resumes as non-primary
-    db.query(Resume).filter(
-        Resume.user_id == current_user.id
-    ).update({"is_primary": False})
-
-    # Create resume record
-    resume = Resume(
-        user_id=current_user.id,
-        filename=file.filename,
-        file_path=file_path,
-        file_size=len(content),
-        parsed_skills=parsed_skills,
-        parsed_text=parsed_text,
-        is_primary=True,
-    )
-    db.add(resume)
-    
-    # Update user profile automatically from resume
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    if not profile:
-        profile = UserProfile(user_id=current_user.id)
-        db.add(profile)
-        
-    # Update skills
-    existing_skills = [s.lower() for s in (profile.skills or [])]
-    new_skills = [s for s in parsed_skills if s.lower() not in existing_skills]
-    profile.skills = (profile.skills or []) + new_skills
-    
-    # Update education and experience from resume
-    if extracted_edu:
-        profile.education = extracted_edu
-        
-    if extracted_exp:
-        profile.experience = extracted_exp
-        
-    db.commit()
-    db.refresh(resume)
 
+@router.get("/resume/{resume_id}/status", response_model=ResumeResponse)
+def get_resume_status(
+    resume_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a resume with its parse_status, for polling after upload."""
+    resume = db.query(Resume).filter(
+        Resume.id == resume_id, Resume.user_id == current_user.id
+    ).first()
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
     return resume
 
 
-
 @router.get("/resume", response_model=List[ResumeResponse])
 def get_resumes(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all resumes of the current user."""
@@ -147,27 +203,24 @@ def search_jobs_endpoint(
 ):
     """Search for jobs with filters."""
     skill_list = [s.strip() for s in skills.split(",")] if skills else None
+    params = {
+        "query": query, "location": location, "skills": skill_list,
+        "stipend_min": stipend_min, "stipend_max": stipend_max, "job_type": job_type,
+        "is_remote": is_remote, "sort_by": sort_by, "page": page, "page_size": page_size,
+    }
 
-    result = search_jobs(
-        db=db,
-        query=query,
-        location=location,
-        skills=skill_list,
-        stipend_min=stipend_min,
-        stipend_max=stipend_max,
-        job_type=job_type,
-        is_remote=is_remote,
-        sort_by=sort_by,
-        page=page,
-        page_size=page_size,
-    )
+    # Popular filter combinations repeat; serve them from cache for a short TTL
+    cache_key = job_search_cache_key(params)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = search_jobs(db=db, **params)
 
     # Enrich jobs with company name
     jobs_data = []
     for job in result["jobs"]:
-        recruiter = db.query(RecruiterProfile).filter(
-            RecruiterProfile.id == job.recruiter_id
-        ).first()
+        recruiter = job.recruiter
         job_dict = {
             "id": job.id,
             "title": job.title,
@@ -187,13 +240,15 @@ def search_jobs_endpoint(
         }
         jobs_data.append(job_dict)
 
-    return {
+    response = {
         "jobs": jobs_data,
         "total_count": result["total_count"],
         "page": result["page"],
         "page_size": result["page_size"],
         "total_pages": result["total_pages"],
     }
+    cache.set(cache_key, response, settings.JOB_SEARCH_CACHE_TTL_SECONDS)
+    return response
 
 
 # --- Apply ---
@@ -206,18 +261,17 @@ def apply_to_job(
 ):
     """Apply to a job/internship."""
     # Check job exists and is active
-    job = db.query(Job).filter(
+    job = db.query(Job).options(joinedload(Job.recruiter)).filter(
         Job.id == job_id, Job.is_approved == True, Job.is_active == True
     ).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found or not active")
 
     # Check if already applied
-    existing = db.query(Application).filter(
+    if row_exists(db, db.query(Application.id).filter(
         Application.user_id == current_user.id,
         Application.job_id == job_id,
-    ).first()
-    if existing:
+    )):
         raise HTTPException(status_code=400, detail="You have already applied to this job")
 
     # Calculate matching score
@@ -249,10 +303,9 @@ def apply_to_job(
         matching_score=matching_score,
     )
     db.add(application)
-    db.commit()
-    db.refresh(application)
+    db.flush()  # assigns application.id for the history row and notification
 
-    # Create initial status history
+    # Application, initial status history and recruiter notification share one commit
     history = ApplicationStatusHistory(
         application_id=application.id,
         new_status="applied",
@@ -260,21 +313,18 @@ def apply_to_job(
         notes="Application submitted",
     )
     db.add(history)
-    db.commit()
 
     # Notify recruiter
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.id == job.recruiter_id
-    ).first()
+    recruiter = job.recruiter
     if recruiter:
         create_notification(
             db, recruiter.user_id, "new_applicant",
             "New Application",
             f"New application received for '{job.title}'",
-            reference_id=application.id, reference_type="application",
+            reference_id=application.id, reference_type="application", commit=False,
         )
 
-    return ApplicationResponse(
+    response = ApplicationResponse(
         id=application.id,
         user_id=application.user_id,
         job_id=application.job_id,
@@ -287,6 +337,14 @@ def apply_to_job(
         job_title=job.title,
         company_name=recruiter.company_name if recruiter else None,
     )
+    user_id = application.user_id
+    recruiter_user_id = recruiter.user_id if recruiter else None
+    db.commit()
+    invalidate_recommendations(user_id)  # applied jobs drop out of recommendations
+    if recruiter_user_id is not None:
+        invalidate_recruiter_cache(recruiter_user_id)  # applicant counts on the recruiter dashboard
+
+    return response
 
 
 # --- Applications Tracking ---
@@ -296,16 +354,16 @@ def get_my_applications(
     db: Session = Depends(get_db)
 ):
     """Get all applications of the current user."""
-    applications = db.query(Application).filter(
+    applications = db.query(Application).options(
+        joinedload(Application.job).joinedload(Job.recruiter)
+    ).filter(
         Application.user_id == current_user.id
     ).order_by(Application.applied_at.desc()).all()
 
     result = []
     for app in applications:
-        job = db.query(Job).filter(Job.id == app.job_id).first()
-        recruiter = db.query(RecruiterProfile).filter(
-            RecruiterProfile.id == job.recruiter_id
-        ).first() if job else None
+        job = app.job
+        recruiter = job.recruiter if job else None
 
         result.append(ApplicationResponse(
             id=app.id,
@@ -331,17 +389,17 @@ def track_application(
     db: Session = Depends(get_db)
 ):
     """Track application status with full history."""
-    application = db.query(Application).filter(
+    application = db.query(Application).options(
+        joinedload(Application.job).joinedload(Job.recruiter)
+    ).filter(
         Application.id == application_id,
         Application.user_id == current_user.id,
     ).first()
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
 
-    job = db.query(Job).filter(Job.id == application.job_id).first()
-    recruiter = db.query(RecruiterProfile).filter(
-        RecruiterProfile.id == job.recruiter_id
-    ).first() if job else None
+    job = application.job
+    recruiter = job.recruiter if job else None
 
     history = db.query(ApplicationStatusHistory).filter(
         ApplicationStatusHistory.application_id == application_id
@@ -77,6 +77,7 @@ class ResumeResponse(BaseModel):
     filename: str
     file_size: Optional[int]
     parsed_skills: List[str]
+    parse_status: Optional[str] = None
     is_primary: bool
     uploaded_at: datetime
 
@@ -1,14 +1,124 @@
 import re
+import functools
 import random
-from typing import List, Optional
+import hashlib
+import heapq
+import sys
+from types import MappingProxyType
+from typing import FrozenSet, Iterable, List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.job import Job
 from models.user import UserProfile, Resume
 from models.application import Application
+from models.recruiter import RecruiterProfile
+from services.cache_service import cache
+
+USER_SKILLS_CACHE_KEY = "user_skills:{user_id}"
+RECOMMENDATIONS_CACHE_PREFIX = "recommendations:"
+
+_WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+_STOP_WORDS = frozenset({
+    "the", "and", "for", "are", "but", "not", "you", "all", "can",
+    "has", "her", "was", "one", "our", "out", "with", "have", "this",
+    "will", "your", "from", "they", "been", "said", "each", "which",
+})
+
+LEARNING_RESOURCES = {
+    "python": {"priority": "high", "resources": ["Python.org tutorials", "Automate the Boring Stuff", "LeetCode Python track"]},
+    "java": {"priority": "high", "resources": ["Oracle Java tutorials", "Codecademy Java", "HackerRank Java"]},
+    "javascript": {"priority": "high", "resources": ["MDN Web Docs", "freeCodeCamp", "JavaScript.info"]},
+    "react": {"priority": "high", "resources": ["React official docs", "Scrimba React course", "Build projects on Frontend Mentor"]},
+    "angular": {"priority": "medium", "resources": ["Angular.io docs", "Tour of Heroes tutorial", "Udemy Angular courses"]},
+    "django": {"priority": "medium", "resources": ["Django official tutorial", "Django for Beginners book", "Django REST framework docs"]},
+    "flask": {"priority": "medium", "resources": ["Flask Mega-Tutorial", "Flask official docs", "Build REST APIs with Flask"]},
+    "sql": {"priority": "high", "resources": ["SQLZoo", "Mode Analytics SQL tutorial", "LeetCode Database problems"]},
+    "machine learning": {"priority": "high", "resources": ["Andrew Ng's ML course", "Kaggle Learn", "Hands-On ML book"]},
+    "docker": {"priority": "medium", "resources": ["Docker official docs", "Play with Docker", "Docker for beginners"]},
+    "git": {"priority": "high", "resources": ["Git official docs", "Atlassian Git tutorials", "Learn Git Branching"]},
+    "aws": {"priority": "medium", "resources": ["AWS Free Tier", "AWS Skill Builder", "A Cloud Guru"]},
+    "data science": {"priority": "high", "resources": ["DataCamp", "Kaggle", "Google Data Analytics Certificate"]},
+}
+
+# Technical questions based on required skills
+SKILL_QUESTIONS = {
+    "python": [
+        {"question": "What are Python decorators and how do they work?", "difficulty": "medium",
+         "sample_answer": "Decorators are functions that modify the behavior of other functions. They use the @decorator syntax and wrap functions to add functionality."},
+        {"question": "Explain the difference between lists and tuples in Python.", "difficulty": "easy",
+         "sample_answer": "Lists are mutable (can be changed after creation), tuples are immutable. Tuples are slightly faster and can be used as dictionary keys."},
+    ],
+    "javascript": [
+        {"question": "What is the difference between var, let, and const?", "difficulty": "easy",
+         "sample_answer": "var has function scope, let and const have block scope. const cannot be reassigned. var is hoisted, let/const are in temporal dead zone."},
+        {"question": "Explain closures in JavaScript.", "difficulty": "medium",
+         "sample_answer": "A closure is a function that has access to variables in its outer scope, even after the outer function has returned."},
+    ],
+    "react": [
+        {"question": "What are React hooks and why were they introduced?", "difficulty": "medium",
+         "sample_answer": "Hooks let you use state and lifecycle features in functional components. They were introduced to simplify component logic and enable code reuse."},
+        {"question": "Explain the virtual DOM in React.", "difficulty": "easy",
+         "sample_answer": "The virtual DOM is a lightweight copy of the actual DOM. React uses it to determine what changes need to be made, then updates only the changed parts."},
+    ],
+    "sql": [
+        {"question": "What is the difference between INNER JOIN and LEFT JOIN?", "difficulty": "easy",
+         "sample_answer": "INNER JOIN returns only matching rows from both tables. LEFT JOIN returns all rows from the left table and matching rows from the right."},
+        {"question": "How do you optimize a slow SQL query?", "difficulty": "hard",
+         "sample_answer": "Use indexes, avoid SELECT *, use EXPLAIN to analyze query plan, optimize JOINs, avoid subqueries when possible, use pagination."},
+    ],
+    "machine learning": [
+        {"question": "What is overfitting and how do you prevent it?", "difficulty": "medium",
+         "sample_answer": "Overfitting is when a model performs well on training data but poorly on new data. Prevention: regularization, cross-validation, more data, simpler models."},
+    ],
+}
+
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+COMPANY_RESEARCH_POINTS = [
+    "Company mission and values",
+    "Recent news and product launches",
+    "Tech stack and engineering blog",
+    "Company culture and team structure",
+    "Growth plans and industry position",
+]
+
+
+@functools.lru_cache(maxsize=256)
+def _extract_words(text: str) -> FrozenSet[str]:
+    """Tokenize text into its set of lowercase 3+ letter words, minus stop words (cached: the same resume is scored against many jobs)."""
+    return frozenset(_WORD_RE.findall(text.lower())) - _STOP_WORDS
+
+
+def normalize_skills(*skill_lists: Iterable[str]) -> FrozenSet[str]:
+    """Merge skill lists into one stripped, lowercased frozenset of interned strings."""
+    return frozenset(sys.intern(s.strip().lower()) for skills in skill_lists for s in (skills or []) if s and s.strip())
+
+
+def invalidate_user_skills(user_id: int):
+    """Drop a user's cached skills after their profile or primary resume changes."""
+    cache.delete(USER_SKILLS_CACHE_KEY.format(user_id=user_id))
+
+
+def recommendations_cache_key(user_id: int, user_skills: FrozenSet[str]) -> str:
+    """Cache key for a user's recommendations; a change of skills gives a new key."""
+    skills_hash = hashlib.sha256(",".join(sorted(user_skills)).encode()).hexdigest()[:16]
+    return f"{RECOMMENDATIONS_CACHE_PREFIX}{user_id}:{skills_hash}"
+
+
+def invalidate_recommendations(user_id: Optional[int] = None):
+    """Drop cached recommendations for one user, or for everyone when the job pool changes."""
+    cache.delete_prefix(RECOMMENDATIONS_CACHE_PREFIX if user_id is None else f"{RECOMMENDATIONS_CACHE_PREFIX}{user_id}:")
+
+
+def _job_skill_set(skills_search: Optional[list], skills_required: Optional[list]) -> FrozenSet[str]:
+    """A job's normalized skills, using the lowercase copy stored at write time when present."""
+    if skills_search is not None:
+        return frozenset(skills_search)
+    return normalize_skills(skills_required)
 
 
 def get_resume_match_score(
-    user_skills: List[str],
+    user_skills: FrozenSet[str],
     resume_text: str,
     job: Job
 ) -> dict:
@@ -26,22 +136,16 @@ def get_resume_match_score(
             "recommendations": ["Add more relevant skills to your resume."],
         }
 
-    user_skills_lower = {s.lower() for s in user_skills}
-    job_skills_lower = {s.lower() for s in job_skills}
+    job_skills_lower = _job_skill_set(job.skills_search, job_skills)
 
-    matched = user_skills_lower.intersection(job_skills_lower)
-    missing = job_skills_lower - user_skills_lower
+    matched = user_skills & job_skills_lower
+    missing = job_skills_lower - user_skills
 
     skill_score = (len(matched) / len(job_skills_lower) * 100) if job_skills_lower else 0
 
     # Keyword overlap from job description
-    job_words = set(re.findall(r'\b[a-zA-Z]{3,}\b', job_desc.lower()))
-    resume_words = set(re.findall(r'\b[a-zA-Z]{3,}\b', resume_text.lower()))
-    stop_words = {"the", "and", "for", "are", "but", "not", "you", "all", "can",
-                  "has", "her", "was", "one", "our", "out", "with", "have", "this",
-                  "will", "your", "from", "they", "been", "said", "each", "which"}
-    job_words -= stop_words
-    resume_words -= stop_words
+    job_words = _extract_words(job_desc)
+    resume_words = _extract_words(resume_text)
     keyword_overlap = job_words.intersection(resume_words)
     keyword_score = (len(keyword_overlap) / len(job_words) * 100) if job_words else 0
 
@@ -65,22 +169,30 @@ def get_resume_match_score(
     }
 
 
+def _job_summary_query(db: Session):
+    """Columns needed for a JobRecommendation, with the recruiter's company name joined in."""
+    return db.query(
+        Job.id, Job.title, Job.location, Job.stipend_min, Job.stipend_max, RecruiterProfile.company_name,
+    ).outerjoin(RecruiterProfile, RecruiterProfile.id == Job.recruiter_id)
+
+
 def get_personalized_recommendations(
     db: Session,
     user_id: int,
-    user_skills: List[str],
+    user_skills: FrozenSet[str],
     limit: int = 10
 ) -> List[dict]:
     """Personalized Job Recommendations based on user skills and application history."""
     if not user_skills:
         # If no skills, return recent active jobs
-        jobs = db.query(Job).filter(
+        jobs = _job_summary_query(db).filter(
             Job.is_approved == True, Job.is_active == True
         ).order_by(Job.created_at.desc()).limit(limit).all()
         return [
             {
                 "job_id": j.id,
                 "title": j.title,
+                "company_name": j.company_name,
                 "location": j.location,
                 "stipend_min": j.stipend_min,
                 "stipend_max": j.stipend_max,
@@ -91,157 +203,125 @@ def get_personalized_recommendations(
             for j in jobs
         ]
 
-    # Get jobs user hasn't applied to yet
-    applied_job_ids = [
-        a.job_id for a in db.query(Application.job_id).filter(
-            Application.user_id == user_id
-        ).all()
-    ]
-
-    jobs = db.query(Job).filter(
+    # Score only on skills for jobs the user hasn't applied to yet
+    applied_job_ids = select(Application.job_id).where(Application.user_id == user_id)
+    candidates = db.query(Job.id, Job.skills_search, Job.skills_required).filter(
         Job.is_approved == True,
         Job.is_active == True,
-        ~Job.id.in_(applied_job_ids) if applied_job_ids else True,
+        Job.id.not_in(applied_job_ids),
     ).all()
 
-    user_skills_lower = {s.lower() for s in user_skills}
-
-    scored_jobs = []
-    for job in jobs:
-        job_skills_lower = {s.lower() for s in (job.skills_required or [])}
+    scored = []  # (score, job_id, matched)
+    is_disjoint = user_skills.isdisjoint
+    for job_id, skills_search, skills_required in candidates:
+        # Most candidates share no skill with the user; reject those without building a set
+        if skills_search is not None and is_disjoint(skills_search):
+            continue
+        job_skills_lower = _job_skill_set(skills_search, skills_required)
         if not job_skills_lower:
             continue
 
-        matched = user_skills_lower.intersection(job_skills_lower)
-        score = (len(matched) / len(job_skills_lower)) * 100
-
-        if score > 0:
-            from models.recruiter import RecruiterProfile
-            recruiter = db.query(RecruiterProfile).filter(
-                RecruiterProfile.id == job.recruiter_id
-            ).first()
-
-            scored_jobs.append({
-                "job_id": job.id,
-                "title": job.title,
-                "company_name": recruiter.company_name if recruiter else None,
-                "location": job.location,
-                "stipend_min": job.stipend_min,
-                "stipend_max": job.stipend_max,
-                "match_score": round(score, 1),
-                "matched_skills": [s.title() for s in matched],
-                "reason": f"Matches {len(matched)} of your skills: {', '.join(s.title() for s in list(matched)[:3])}",
-            })
-
-    # Sort by match score
-    scored_jobs.sort(key=lambda x: x["match_score"], reverse=True)
-    return scored_jobs[:limit]
-
-
-def get_skill_gap_analysis(
-    user_skills: List[str],
-    job: Job
-) -> dict:
-    """Skill Gap Analysis - identify missing skills and suggest learning paths."""
-    job_skills = job.skills_required or []
-    user_skills_lower = {s.lower() for s in user_skills}
-    job_skills_lower = {s.lower() for s in job_skills}
-
-    matched = user_skills_lower.intersection(job_skills_lower)
-    missing = job_skills_lower - user_skills_lower
-
-    gap_percentage = (len(missing) / len(job_skills_lower) * 100) if job_skills_lower else 0
+        matched = user_skills & job_skills_lower
+        if matched:
+            scored.append(((len(matched) / len(job_skills_lower)) * 100, job_id, matched))
+
+    # Top matches by score, then load display fields for the winners only
+    top = heapq.nlargest(limit, scored, key=lambda x: x[0])
+    if not top:
+        return []
+    jobs = {j.id: j for j in _job_summary_query(db).filter(Job.id.in_([job_id for _, job_id, _ in top])).all()}
+
+    return [
+        {
+            "job_id": job_id,
+            "title": jobs[job_id].title,
+            "company_name": jobs[job_id].company_name,
+            "location": jobs[job_id].location,
+            "stipend_min": jobs[job_id].stipend_min,
+            "stipend_max": jobs[job_id].stipend_max,
+            "match_score": round(score, 1),
+            "matched_skills": [s.title() for s in matched],
+            "reason": f"Matches {len(matched)} of your skills: {', '.join(s.title() for s in list(matched)[:3])}",
+        }
+        for score, job_id, matched in top
+    ]
 
-    # Generate learning suggestions
-    learning_resources = {
-        "python": {"priority": "high", "resources": ["Python.org tutorials", "Automate the Boring Stuff", "LeetCode Python track"]},
-        "java": {"priority": "high", "resources": ["Oracle Java tutorials", "Codecademy Java", "HackerRank Java"]},
-        "javascript": {"priority": "high", "resources": ["MDN Web Docs", "freeCodeCamp", "JavaScript.info"]},
-        "react": {"priority": "high", "resources": ["React official docs", "Scrimba React course", "Build projects on Frontend Mentor"]},
-        "angular": {"priority": "medium", "resources": ["Angular.io docs", "Tour of Heroes tutorial", "Udemy Angular courses"]},
-        "django": {"priority": "medium", "resources": ["Django official tutorial", "Django for Beginners book", "Django REST framework docs"]},
-        "flask": {"priority": "medium", "resources": ["Flask Mega-Tutorial", "Flask official docs", "Build REST APIs with Flask"]},
-        "sql": {"priority": "high", "resources": ["SQLZoo", "Mode Analytics SQL tutorial", "LeetCode Database problems"]},
-        "machine learning": {"priority": "high", "resources": ["Andrew Ng's ML course", "Kaggle Learn", "Hands-On ML book"]},
-        "docker": {"priority": "medium", "resources": ["Docker official docs", "Play with Docker", "Docker for beginners"]},
-        "git": {"priority": "high", "resources": ["Git official docs", "Atlassian Git tutorials", "Learn Git Branching"]},
-        "aws": {"priority": "medium", "resources": ["AWS Free Tier", "AWS Skill Builder", "A Cloud Guru"]},
-        "data science": {"priority": "high", "resources": ["DataCamp", "Kaggle", "Google Data Analytics Certificate"]},
-    }
 
+@functools.lru_cache(maxsize=2048)
+def _learning_suggestions(missing: FrozenSet[str]) -> tuple:
+    """Learning suggestions for a set of missing skills, highest priority first; cached and read-only, callers get copies."""
     suggestions = []
     for skill in missing:
         skill_lower = skill.lower()
-        if skill_lower in learning_resources:
-            info = learning_resources[skill_lower]
+        if skill_lower in LEARNING_RESOURCES:
+            info = LEARNING_RESOURCES[skill_lower]
             suggestions.append({
                 "skill": skill.title(),
                 "priority": info["priority"],
-                "resources": info["resources"],
+                "resources": tuple(info["resources"]),
             })
         else:
             suggestions.append({
                 "skill": skill.title(),
                 "priority": "medium",
-                "resources": [
+                "resources": (
                     f"Search for '{skill}' on Coursera",
                     f"YouTube tutorials on {skill}",
                     f"Practice {skill} on relevant platforms",
-                ],
+                ),
             })
 
     # Sort by priority
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    suggestions.sort(key=lambda x: priority_order.get(x["priority"], 1))
+    suggestions.sort(key=lambda x: PRIORITY_ORDER.get(x["priority"], 1))
+    return tuple(MappingProxyType(suggestion) for suggestion in suggestions)
+
+
+def get_skill_gap_analysis(
+    user_skills: FrozenSet[str],
+    job: Job
+) -> dict:
+    """Skill Gap Analysis - identify missing skills and suggest learning paths."""
+    job_skills_lower = _job_skill_set(job.skills_search, job.skills_required)
+
+    matched = user_skills & job_skills_lower
+    missing = job_skills_lower - user_skills
+
+    gap_percentage = (len(missing) / len(job_skills_lower) * 100) if job_skills_lower else 0
 
     return {
-        "user_skills": [s.title() for s in user_skills_lower],
+        "user_skills": [s.title() for s in user_skills],
         "required_skills": [s.title() for s in job_skills_lower],
         "matched_skills": [s.title() for s in matched],
         "missing_skills": [s.title() for s in missing],
         "gap_percentage": round(gap_percentage, 1),
-        "learning_suggestions": suggestions,
+        "learning_suggestions": [
+            {**suggestion, "resources": list(suggestion["resources"])}
+            for suggestion in _learning_suggestions(missing)
+        ],
     }
 
 
-def generate_interview_prep(job: Job, user_skills: List[str]) -> dict:
-    """AI-Powered Interview Preparation - generate questions and tips."""
-    job_title = job.title or "Software Engineer"
-    job_skills = job.skills_required or []
-    job_desc = job.description or ""
+def interview_prep_hash(job: Job, user_skills: FrozenSet[str]) -> str:
+    """Hash the inputs of generate_interview_prep so an unchanged request can reuse a saved prep."""
+    key = ",".join(sorted(user_skills)) + f"|{job.id}|{job.updated_at.isoformat() if job.updated_at else ''}"
+    return hashlib.sha256(key.encode()).hexdigest()
 
-    # Technical questions based on required skills
-    skill_questions = {
-        "python": [
-            {"question": "What are Python decorators and how do they work?", "difficulty": "medium",
-             "sample_answer": "Decorators are functions that modify the behavior of other functions. They use the @decorator syntax and wrap functions to add functionality."},
-            {"question": "Explain the difference between lists and tuples in Python.", "difficulty": "easy",
-             "sample_answer": "Lists are mutable (can be changed after creation), tuples are immutable. Tuples are slightly faster and can be used as dictionary keys."},
-        ],
-        "javascript": [
-            {"question": "What is the difference between var, let, and const?", "difficulty": "easy",
-             "sample_answer": "var has function scope, let and const have block scope. const cannot be reassigned. var is hoisted, let/const are in temporal dead zone."},
-            {"question": "Explain closures in JavaScript.", "difficulty": "medium",
-             "sample_answer": "A closure is a function that has access to variables in its outer scope, even after the outer function has returned."},
-        ],
-        "react": [
-            {"question": "What are React hooks and why were they introduced?", "difficulty": "medium",
-             "sample_answer": "Hooks let you use state and lifecycle features in functional components. They were introduced to simplify component logic and enable code reuse."},
-            {"question": "Explain the virtual DOM in React.", "difficulty": "easy",
-             "sample_answer": "The virtual DOM is a lightweight copy of the actual DOM. React uses it to determine what changes need to be made, then updates only the changed parts."},
-        ],
-        "sql": [
-            {"question": "What is the difference between INNER JOIN and LEFT JOIN?", "difficulty": "easy",
-             "sample_answer": "INNER JOIN returns only matching rows from both tables. LEFT JOIN returns all rows from the left table and matching rows from the right."},
-            {"question": "How do you optimize a slow SQL query?", "difficulty": "hard",
-             "sample_answer": "Use indexes, avoid SELECT *, use EXPLAIN to analyze query plan, optimize JOINs, avoid subqueries when possible, use pagination."},
-        ],
-        "machine learning": [
-            {"question": "What is overfitting and how do you prevent it?", "difficulty": "medium",
-             "sample_answer": "Overfitting is when a model performs well on training data but poorly on new data. Prevention: regularization, cross-validation, more data, simpler models."},
-        ],
+
+def generate_interview_prep(job: Job, user_skills: FrozenSet[str]) -> dict:
+    """AI-Powered Interview Preparation - generate questions and tips."""
+    prep = _interview_prep_core(tuple(job.skills_required or ()), job.title or "Software Engineer")
+    return {
+        "questions": [dict(q) for q in prep["questions"]],
+        "tips": list(prep["tips"]),
+        "focus_areas": list(prep["focus_areas"]),
+        "company_research_points": list(prep["company_research_points"]),
     }
 
+
+@functools.lru_cache(maxsize=2048)
+def _interview_prep_core(job_skills: tuple, job_title: str) -> MappingProxyType:
+    """Interview prep for a job's skills and title; cached, callers get copies."""
+
     # Behavioral questions
     behavioral_questions = [
         {"question": "Tell me about a challenging project you worked on.", "difficulty": "medium",
@@ -258,8 +338,8 @@ def generate_interview_prep(job: Job, user_skills: List[str]) -> dict:
     questions = []
     for skill in job_skills:
         skill_lower = skill.lower()
-        if skill_lower in skill_questions:
-            for q in skill_questions[skill_lower]:
+        if skill_lower in SKILL_QUESTIONS:
+            for q in SKILL_QUESTIONS[skill_lower]:
                 q_copy = q.copy()
                 q_copy["category"] = "technical"
                 questions.append(q_copy)
@@ -285,15 +365,9 @@ def generate_interview_prep(job: Job, user_skills: List[str]) -> dict:
     focus_areas = list(set(job_skills[:6])) if job_skills else ["Problem Solving", "Communication"]
     focus_areas.append("System Design" if "senior" in job_title.lower() else "Coding Fundamentals")
 
-    return {
-        "questions": questions,
-        "tips": tips,
-        "focus_areas": focus_areas,
-        "company_research_points": [
-            "Company mission and values",
-            "Recent news and product launches",
-            "Tech stack and engineering blog",
-            "Company culture and team structure",
-            "Growth plans and industry position",
-        ],
-    }
+    return MappingProxyType({
+        "questions": tuple(questions),
+        "tips": tuple(tips),
+        "focus_areas": tuple(focus_areas),
+        "company_research_points": COMPANY_RESEARCH_POINTS,
+    })
@@ -1,20 +1,33 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, true
 from datetime import datetime, timedelta
 from models.user import User, UserProfile
 from models.job import Job
 from models.application import Application
 from models.dispute import Dispute
 from models.recruiter import RecruiterProfile
+from services.cache_service import cache
+
+# Per recruiter user id; see invalidate_recruiter_cache
+RECRUITER_ANALYTICS_CACHE_KEY = "recruiter_analytics:{user_id}"
+RECRUITER_JOBS_CACHE_KEY = "recruiter_jobs:{user_id}"
+
+
+def invalidate_recruiter_cache(user_id: int):
+    """Drop a recruiter's cached dashboard analytics and job list after one of their jobs or applications changes."""
+    cache.delete(RECRUITER_ANALYTICS_CACHE_KEY.format(user_id=user_id))
+    cache.delete(RECRUITER_JOBS_CACHE_KEY.format(user_id=user_id))
 
 
 def get_recruiter_analytics(db: Session, recruiter_id: int) -> dict:
     """Get analytics for a recruiter's dashboard."""
-    # Get all jobs for this recruiter
-    jobs = db.query(Job).filter(Job.recruiter_id == recruiter_id).all()
-    job_ids = [j.id for j in jobs]
+    total_jobs, active_jobs, total_views = db.query(
+        func.count(Job.id),
+        func.count(Job.id).filter(Job.is_active == True),
+        func.coalesce(func.sum(Job.views_count), 0),
+    ).filter(Job.recruiter_id == recruiter_id).one()
 
-    if not job_ids:
+    if not total_jobs:
         return {
             "total_jobs": 0,
             "active_jobs": 0,
@@ -25,11 +38,19 @@ def get_recruiter_analytics(db: Session, recruiter_id: int) -> dict:
             "jobs_analytics": [],
         }
 
-    total_applications = db.query(Application).filter(
-        Application.job_id.in_(job_ids)
-    ).count()
+    # Only the columns the per-job breakdown uses
+    jobs = db.query(
+        Job.id, Job.title, Job.views_count, Job.is_active, Job.created_at
+    ).filter(Job.recruiter_id == recruiter_id).all()
+    job_ids = [j.id for j in jobs]
 
-    total_views = sum(j.views_count for j in jobs)
+    # Per-job application counts in one GROUP BY
+    app_counts = dict(db.query(
+        Application.job_id, func.count(Application.id)
+    ).filter(
+        Application.job_id.in_(job_ids)
+    ).group_by(Application.job_id).all())
+    total_applications = sum(app_counts.values())
 
     # Status breakdown
     status_counts = db.query(
@@ -43,7 +64,7 @@ def get_recruiter_analytics(db: Session, recruiter_id: int) -> dict:
     # Per-job analytics
     jobs_analytics = []
     for job in jobs:
-        app_count = db.query(Application).filter(Application.job_id == job.id).count()
+        app_count = app_counts.get(job.id, 0)
         jobs_analytics.append({
             "job_id": job.id,
             "title": job.title,
@@ -55,67 +76,76 @@ def get_recruiter_analytics(db: Session, recruiter_id: int) -> dict:
         })
 
     return {
-        "total_jobs": len(jobs),
-        "active_jobs": sum(1 for j in jobs if j.is_active),
+        "total_jobs": total_jobs,
+        "active_jobs": active_jobs,
         "total_applications": total_applications,
         "total_views": total_views,
-        "avg_applications_per_job": round(total_applications / len(jobs), 1) if jobs else 0,
+        "avg_applications_per_job": round(total_applications / total_jobs, 1),
         "status_breakdown": status_breakdown,
         "jobs_analytics": jobs_analytics,
     }
 
 
+def _top_job_skills(db: Session, limit: int) -> list:
+    """(skill, count) for the most requested skills across approved jobs, aggregated in SQL."""
+    if db.get_bind().dialect.name == "postgresql":
+        skills = func.json_array_elements_text(Job.skills_required).table_valued("value")
+    else:
+        skills = func.json_each(Job.skills_required).table_valued("value")
+    skill = func.lower(skills.c.value)
+    count = func.count()
+    return db.query(skill, count).select_from(Job).join(skills, true()).filter(
+        Job.is_approved == True
+    ).group_by(skill).order_by(count.desc(), skill).limit(limit).all()
+
+
 def get_platform_analytics(db: Session) -> dict:
     """Get platform-wide analytics for admin dashboard."""
     now = datetime.utcnow()
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    total_users = db.query(User).filter(User.role == "user").count()
-    total_recruiters = db.query(User).filter(User.role == "recruiter").count()
-    total_jobs = db.query(Job).count()
-    total_applications = db.query(Application).count()
-    active_jobs = db.query(Job).filter(Job.is_active == True, Job.is_approved == True).count()
-    pending_approvals = db.query(Job).filter(Job.is_approved == False).count()
-    total_disputes = db.query(Dispute).count()
-    open_disputes = db.query(Dispute).filter(Dispute.status.in_(["open", "under_review"])).count()
-
-    # This month stats
-    users_this_month = db.query(User).filter(
-        User.created_at >= month_start, User.role == "user"
-    ).count()
-    jobs_this_month = db.query(Job).filter(Job.created_at >= month_start).count()
-    applications_this_month = db.query(Application).filter(
-        Application.applied_at >= month_start
-    ).count()
-
-    # Top skills from job postings
-    all_jobs = db.query(Job).filter(Job.is_approved == True).all()
-    skill_counts = {}
-    for job in all_jobs:
-        for skill in (job.skills_required or []):
-            skill_lower = skill.lower()
-            skill_counts[skill_lower] = skill_counts.get(skill_lower, 0) + 1
-    top_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    top_skills = [{"skill": s.title(), "count": c} for s, c in top_skills]
-
-    # Application status breakdown
+    # One conditional-aggregate query per table (COUNT(*) FILTER (WHERE ...))
+    users = db.query(
+        func.count().filter(User.role == "user").label("total_users"),
+        func.count().filter(User.role == "recruiter").label("total_recruiters"),
+        func.count().filter(User.role == "user", User.created_at >= month_start).label("users_this_month"),
+    ).one()
+    jobs = db.query(
+        func.count().label("total_jobs"),
+        func.count().filter(Job.is_active == True, Job.is_approved == True).label("active_jobs"),
+        func.count().filter(Job.is_approved == False).label("pending_approvals"),
+        func.count().filter(Job.created_at >= month_start).label("jobs_this_month"),
+    ).select_from(Job).one()
+    applications = db.query(
+        func.count().label("total_applications"),
+        func.count().filter(Application.applied_at >= month_start).label("applications_this_month"),
+    ).select_from(Application).one()
+    disputes = db.query(
+        func.count().label("total_disputes"),
+        func.count().filter(Dispute.status.in_(["open", "under_review"])).label("open_disputes"),
+    ).select_from(Dispute).one()
+
+    # Top skills from job postings, counted in the database
+    top_skills = [{"skill": s.title(), "count": c} for s, c in _top_job_skills(db, 10)]
+
+    # Application status breakdown; computed here rather than kept in counters, since the whole result is cached
     status_counts = db.query(
         Application.status, func.count(Application.id)
     ).group_by(Application.status).all()
     application_status_breakdown = {status: count for status, count in status_counts}
 
     return {
-        "total_users": total_users,
-        "total_recruiters": total_recruiters,
-        "total_jobs": total_jobs,
-        "total_applications": total_applications,
-        "active_jobs": active_jobs,
-        "pending_approvals": pending_approvals,
-        "total_disputes": total_disputes,
-        "open_disputes": open_disputes,
-        "users_this_month": users_this_month,
-        "jobs_this_month": jobs_this_month,
-        "applications_this_month": applications_this_month,
+        "total_users": users.total_users,
+        "total_recruiters": users.total_recruiters,
+        "total_jobs": jobs.total_jobs,
+        "total_applications": applications.total_applications,
+        "active_jobs": jobs.active_jobs,
+        "pending_approvals": jobs.pending_approvals,
+        "total_disputes": disputes.total_disputes,
+        "open_disputes": disputes.open_disputes,
+        "users_this_month": users.users_this_month,
+        "jobs_this_month": jobs.jobs_this_month,
+        "applications_this_month": applications.applications_this_month,
         "top_skills": top_skills,
         "application_status_breakdown": application_status_breakdown,
     }
@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from config import settings
+
+
+class TTLCache:
+    """Thread-safe in-process cache whose entries expire after a per-key TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Any]] = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: int):
+        """Store a value for ttl_seconds, evicting the oldest entry when full."""
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+
+    def incr(self, key: str, ttl_seconds: int) -> int:
+        """Increment a counter and return it; the window starts (with TTL) on the first hit."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                self._entries.pop(key, None)
+                if len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                expires_at, count = now + ttl_seconds, 0
+            else:
+                expires_at, count = entry
+            self._entries[key] = (expires_at, count + 1)
+            return count + 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        """Drop every entry whose key starts with prefix."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+# Singleton cache shared by all requests in this worker process
+cache = TTLCache(max_entries=settings.CACHE_MAX_ENTRIES)
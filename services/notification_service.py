@@ -1,8 +1,10 @@
 from typing import List, Dict, Optional
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
+from database import SessionLocal
 from models.notification import Notification
 from datetime import datetime
-import json
+import orjson
 import asyncio
 
 
@@ -12,8 +14,10 @@ class ConnectionManager:
 
     def __init__(self):
         self.active_connections: Dict[int, List] = {}  # user_id -> list of websockets
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # loop the websockets live on
 
     async def connect(self, websocket, user_id: int):
+        self.loop = asyncio.get_running_loop()
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
@@ -28,16 +32,32 @@ class ConnectionManager:
     async def send_notification(self, user_id: int, notification: dict):
         """Send a notification to a specific user via WebSocket."""
         if user_id in self.active_connections:
-            message = json.dumps(notification)
+            message = orjson.dumps(notification).decode()
             for connection in self.active_connections[user_id]:
                 try:
                     await connection.send_text(message)
                 except Exception:
                     pass
 
+    def push(self, user_id: int, notification: dict):
+        """Best-effort delivery callable from any thread (sync routes run in the threadpool, off the loop)."""
+        if self.loop is None or user_id not in self.active_connections:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            self.loop.create_task(self.send_notification(user_id, notification))
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.send_notification(user_id, notification), self.loop)
+        except RuntimeError:
+            pass  # loop already shut down
+
     async def broadcast(self, message: dict):
         """Broadcast a message to all connected users."""
-        text = json.dumps(message)
+        text = orjson.dumps(message).decode()
         for user_id, connections in self.active_connections.items():
             for connection in connections:
                 try:
@@ -49,6 +69,22 @@ class ConnectionManager:
 # Singleton connection manager
 manager = ConnectionManager()
 
+# session.info key for WebSocket pushes waiting on the session's commit
+_PENDING_PUSHES_KEY = "pending_notification_pushes"
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _push_committed_notifications(session):
+    for user_id, payload in session.info.pop(_PENDING_PUSHES_KEY, []):
+        manager.push(user_id, payload)
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _drop_uncommitted_notifications(session, transaction):
+    # Runs after after_commit on success, so anything left here was rolled back or discarded
+    if transaction.parent is None:
+        session.info.pop(_PENDING_PUSHES_KEY, None)
+
 
 def create_notification(
     db: Session,
@@ -57,9 +93,15 @@ def create_notification(
     title: str,
     message: str,
     reference_id: Optional[int] = None,
-    reference_type: Optional[str] = None
+    reference_type: Optional[str] = None,
+    commit: bool = True,
 ) -> Notification:
-    """Create a new notification and attempt to send via WebSocket."""
+    """Create a new notification and send it via WebSocket once it is committed.
+
+    Pass commit=False to only flush it into the caller's open transaction,
+    so the caller's own commit persists it alongside its other changes; the
+    push waits for that commit and is dropped if the transaction rolls back.
+    """
     notification = Notification(
         user_id=user_id,
         type=notification_type,
@@ -69,28 +111,55 @@ def create_notification(
         reference_type=reference_type,
     )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
-
-    # Try to send via WebSocket
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            asyncio.ensure_future(manager.send_notification(user_id, {
-                "id": notification.id,
-                "type": notification_type,
-                "title": title,
-                "message": message,
-                "reference_id": reference_id,
-                "reference_type": reference_type,
-                "created_at": notification.created_at.isoformat(),
-            }))
-    except Exception:
-        pass  # WebSocket delivery is best-effort
+    db.flush()
+
+    db.info.setdefault(_PENDING_PUSHES_KEY, []).append((user_id, {
+        "id": notification.id,
+        "type": notification_type,
+        "title": title,
+        "message": message,
+        "reference_id": reference_id,
+        "reference_type": reference_type,
+        "created_at": notification.created_at.isoformat(),
+    }))
+
+    if commit:
+        db.commit()
+        db.refresh(notification)
 
     return notification
 
 
+def create_notifications_batch(notifications: List[dict]):
+    """Insert notification rows in one multi-row INSERT on a fresh session.
+
+    Meant to run from BackgroundTasks after the response is sent; each dict
+    carries user_id, type, title, message and optional reference_id/reference_type.
+    """
+    if not notifications:
+        return
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            insert(Notification).returning(Notification.id, Notification.created_at, sort_by_parameter_order=True),
+            notifications,
+        ).all()
+        db.commit()
+    finally:
+        db.close()
+
+    for data, (notification_id, created_at) in zip(notifications, rows):
+        manager.push(data["user_id"], {
+            "id": notification_id,
+            "type": data["type"],
+            "title": data["title"],
+            "message": data["message"],
+            "reference_id": data.get("reference_id"),
+            "reference_type": data.get("reference_type"),
+            "created_at": created_at.isoformat(),
+        })
+
+
 def get_unread_count(db: Session, user_id: int) -> int:
     """Get the count of unread notifications for a user."""
     return db.query(Notification).filter(
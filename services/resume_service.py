@@ -1,24 +1,125 @@
-import os
 import re
+import functools
+import zipfile
 import PyPDF2
-
-from typing import List, Optional
-from config import settings
-
-
-def save_resume(file_content: bytes, filename: str, user_id: int) -> str:
-    """Save a resume file and return the file path."""
-    safe_filename = f"user_{user_id}_{filename}"
-    file_path = os.path.join(settings.UPLOAD_DIR, "resumes", safe_filename)
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-    return file_path
-
-
-def delete_resume(file_path: str):
-    """Delete a resume file."""
-    if os.path.exists(file_path):
-        os.remove(file_path)
+from pathlib import Path
+from xml.etree import ElementTree
+
+from typing import FrozenSet, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r'\b\w+\b')
+_STOP_WORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "been",
+    "being", "have", "has", "had", "do", "does", "did", "will",
+    "would", "could", "should", "may", "might", "and", "or", "but",
+    "in", "on", "at", "to", "for", "of", "with", "by", "from",
+})
+
+# Comprehensive skill keywords
+SKILL_KEYWORDS = [
+    # Programming Languages
+    "python", "java", "javascript", "typescript", "c++", "c#", "ruby", "go",
+    "rust", "swift", "kotlin", "php", "scala", "r", "matlab", "perl",
+    # Web Frameworks
+    "react", "angular", "vue", "django", "flask", "fastapi", "express",
+    "spring", "rails", "laravel", "next.js", "nuxt.js", "svelte",
+    # Data & AI
+    "machine learning", "deep learning", "tensorflow", "pytorch", "pandas",
+    "numpy", "scikit-learn", "nlp", "computer vision", "data science",
+    "data analysis", "big data", "spark", "hadoop",
+    # Databases
+    "sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch",
+    "cassandra", "dynamodb", "firebase", "sqlite",
+    # Cloud & DevOps
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "jenkins",
+    "ci/cd", "linux", "git", "github", "gitlab",
+    # Mobile
+    "android", "ios", "react native", "flutter", "xamarin",
+    # Design
+    "figma", "sketch", "adobe xd", "photoshop", "illustrator",
+    # Other
+    "html", "css", "rest api", "graphql", "microservices", "agile",
+    "scrum", "jira", "confluence", "tableau", "power bi",
+    "excel", "communication", "leadership", "teamwork", "problem solving",
+]
+
+
+def _skill_pattern(skill: str) -> re.Pattern:
+    """Whole-word pattern for a skill, e.g. so 'go' does not match 'government'."""
+    # Skills that start or end with non-word characters (like C++, C#, .NET) use lookarounds
+    pattern = re.escape(skill)
+    pattern = (r'\b' if re.match(r'^\w', pattern) else r'(?<!\w)') + pattern
+    pattern = pattern + (r'\b' if re.search(r'\w$', pattern) else r'(?!\w)')
+    return re.compile(pattern)
+
+
+# (keyword, display name, compiled pattern), built once at import
+_SKILL_PATTERNS = [
+    (skill, skill.title() if len(skill) > 3 else skill.upper(), _skill_pattern(skill))
+    for skill in SKILL_KEYWORDS
+]
+
+# Education/experience parsing patterns, compiled once at import instead of per line
+_DEGREE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"\b(Bachelor|B\.?E\.?|B\.?Tech|B\.?S\.?|B\.?A\.?|Master|M\.?Tech|M\.?S\.?|M\.?E\.?|Ph\.?D|Doctoral|Post[\s-]Graduate|Graduate|Under[\s-]Graduate|MBA|Diploma|PUC|SSLC|10th|12th)\b",
+    r"\b(Secondary|Matriculation|Schooling)\b",
+))
+_INSTITUTION_KEYWORDS = [
+    "University", "College", "Institute", "School", "Academy", "Vidhyalaya",
+    "Polytechnic", "Foundation", "High School", "Centre", "Vidya"
+]
+_INSTITUTION_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, _INSTITUTION_KEYWORDS)) + r")\b", re.IGNORECASE
+)
+# Patterns that indicate a line is NOT an education line
+_EDU_BLACKLIST_RE = re.compile("|".join([
+    r"utm_", r"objective", r"summary", r"profile", r"http", r"www\.", r"career",
+    r"seek", r"opportunity", r"challenging", r"contribute", r"utilize", r"environment"
+]), re.IGNORECASE)
+# Years and ranges like 2020-2024 or 2023 - Present
+_YEAR_RANGE_RE = re.compile(
+    r"\b((?:19[9]\d|20[0-2]\d)(?:\s*[-–]\s*(?:20[0-2]\d|Present|Current))?)\b", re.IGNORECASE
+)
+_LEADING_BULLETS_RE = re.compile(r'^[•\d\.\-\s]+')
+# Common job titles indicating experience, in priority order
+_JOB_KEYWORD_PATTERNS = tuple(
+    (kw, re.compile(r"\b" + kw + r"\b", re.IGNORECASE))
+    for kw in ["Developer", "Engineer", "Intern", "Analyst", "Manager", "Lead", "Consultant", "Designer", "Specialist"]
+)
+# Education terms, strictly excluded from experience
+_EDU_INDICATOR_RE = re.compile(r"\b(?:" + "|".join([
+    "Bachelor", "Master", "Degree", "University", "College", "Diploma", "Puc", "Sslc", "10Th", "12Th", "Institute", "School"
+]) + r")\b", re.IGNORECASE)
+
+
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MAX_DOCX_XML_BYTES = 50 * 1024 * 1024  # refuse zip bombs disguised as resumes
+
+
+@functools.lru_cache(maxsize=256)
+def _extract_words(text: str) -> FrozenSet[str]:
+    """Tokenize text into its set of lowercase words, minus stop words (cached: the same resume is scored against many jobs)."""
+    return frozenset(_TOKEN_RE.findall(text.lower())) - _STOP_WORDS
+
+
+def _read_docx_text(file_path: str) -> str:
+    """Extract paragraph text from a .docx (a zip holding word/document.xml)."""
+    with zipfile.ZipFile(file_path) as docx:
+        if docx.getinfo("word/document.xml").file_size > _MAX_DOCX_XML_BYTES:
+            return ""
+        root = ElementTree.fromstring(docx.read("word/document.xml"))
+    paragraphs = (
+        "".join(node.text or "" for node in para.iter(_DOCX_NS + "t"))
+        for para in root.iter(_DOCX_NS + "p")
+    )
+    return "\n".join(paragraphs).strip()
+
+
+def _read_pdf_text(file_path: str) -> str:
+    """Extract page text from a PDF with PyPDF2, joined once rather than concatenated per page."""
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return "\n".join(filter(None, (page.extract_text() for page in reader.pages))).strip()
 
 
 def parse_resume_text(file_path: str) -> str:
@@ -26,22 +127,17 @@ def parse_resume_text(file_path: str) -> str:
     try:
         # For .txt files, read directly
         if file_path.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()
+            return Path(file_path).read_text(encoding="utf-8", errors="ignore")
+
+        # For DOCX files, read the document XML instead of decoding the zip bytes
+        if file_path.endswith(".docx"):
+            return _read_docx_text(file_path)
 
         # For PDF files, use PyPDF2
         if file_path.endswith(".pdf"):
-            text = ""
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text.strip()
-
-        # For DOC/DOCX or others - return empty or basic attempt
-        # (In production, consider using python-docx for .docx)
+            return _read_pdf_text(file_path)
+
+        # For legacy DOC or others - basic attempt
         with open(file_path, "rb") as f:
             content = f.read()
             try:
@@ -58,99 +154,41 @@ def parse_resume_text(file_path: str) -> str:
 
 def extract_skills_from_text(text: str) -> List[str]:
     """Extract skills from resume text using keyword matching."""
-    # Comprehensive skill keywords
-    skill_keywords = [
-        # Programming Languages
-        "python", "java", "javascript", "typescript", "c++", "c#", "ruby", "go",
-        "rust", "swift", "kotlin", "php", "scala", "r", "matlab", "perl",
-        # Web Frameworks
-        "react", "angular", "vue", "django", "flask", "fastapi", "express",
-        "spring", "rails", "laravel", "next.js", "nuxt.js", "svelte",
-        # Data & AI
-        "machine learning", "deep learning", "tensorflow", "pytorch", "pandas",
-        "numpy", "scikit-learn", "nlp", "computer vision", "data science",
-        "data analysis", "big data", "spark", "hadoop",
-        # Databases
-        "sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch",
-        "cassandra", "dynamodb", "firebase", "sqlite",
-        # Cloud & DevOps
-        "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "jenkins",
-        "ci/cd", "linux", "git", "github", "gitlab",
-        # Mobile
-        "android", "ios", "react native", "flutter", "xamarin",
-        # Design
-        "figma", "sketch", "adobe xd", "photoshop", "illustrator",
-        # Other
-        "html", "css", "rest api", "graphql", "microservices", "agile",
-        "scrum", "jira", "confluence", "tableau", "power bi",
-        "excel", "communication", "leadership", "teamwork", "problem solving",
-    ]
-
     text_lower = text.lower()
-    found_skills = []
+    found_skills = set()
 
-    for skill in skill_keywords:
-        # Use regex to match whole words/phrases to avoid partial matches (e.g., 'go' in 'government')
-        # We handle skills that start or end with non-word characters (like C++, C#, .NET)
-        pattern = re.escape(skill.lower())
-        
-        # If it starts with a word char, require word boundary at start
-        if re.match(r'^\w', pattern):
-            pattern = r'\b' + pattern
-        else: # Starts with non-word char like .NET
-            pattern = r'(?<!\w)' + pattern
-            
-        # If it ends with a word char, require word boundary at end
-        if re.search(r'\w$', pattern):
-            pattern = pattern + r'\b'
-        else: # Ends with non-word char like C++ or C#
-            pattern = pattern + r'(?!\w)'
-            
-        if re.search(pattern, text_lower):
-            found_skills.append(skill.title() if len(skill) > 3 else skill.upper())
-            
-    return list(set(found_skills))
+    for skill, display, pattern in _SKILL_PATTERNS:
+        # Cheap substring check first; the boundary regex only runs on candidates
+        if skill in text_lower and pattern.search(text_lower):
+            found_skills.add(display)
+
+    return list(found_skills)
 
 
 def extract_education_from_text(text: str) -> List[dict]:
     """Extract education details from resume text using common patterns."""
+    return _education_from_lines(text.split('\n'))
+
+
+def _education_from_lines(lines: List[str]) -> List[dict]:
     education = []
-    
-    # Common degree patterns including secondary and higher secondary (Indian context)
-    degree_patterns = [
-        r"\b(Bachelor|B\.?E\.?|B\.?Tech|B\.?S\.?|B\.?A\.?|Master|M\.?Tech|M\.?S\.?|M\.?E\.?|Ph\.?D|Doctoral|Post[\s-]Graduate|Graduate|Under[\s-]Graduate|MBA|Diploma|PUC|SSLC|10th|12th)\b",
-        r"\b(Secondary|Matriculation|Schooling)\b"
-    ]
-    
-    # Common institution keywords
-    inst_keywords = [
-        "University", "College", "Institute", "School", "Academy", "Vidhyalaya", 
-        "Polytechnic", "Foundation", "High School", "Centre", "Vidya"
-    ]
-
-    # Patterns that indicate this is NOT an education line
-    blacklist_patterns = [
-        r"utm_", r"objective", r"summary", r"profile", r"http", r"www\.", r"career",
-        r"seek", r"opportunity", r"challenging", r"contribute", r"utilize", r"environment"
-    ]
-    
-    lines = text.split('\n')
+
     for i, line in enumerate(lines):
         line = line.strip()
         if len(line) < 3 or len(line) > 120: continue
-        if any(re.search(p, line, re.IGNORECASE) for p in blacklist_patterns): continue
+        if _EDU_BLACKLIST_RE.search(line): continue
         
         is_edu_line = False
         degree = None
         
         # Check for degree in current, previous or next line to associate with institution
-        for pattern in degree_patterns:
+        for pattern in _DEGREE_PATTERNS:
             # Check current line
-            match = re.search(pattern, line, re.IGNORECASE)
+            match = pattern.search(line)
             if not match and i > 0: # Check line above
-                match = re.search(pattern, lines[i-1], re.IGNORECASE)
+                match = pattern.search(lines[i-1])
             if not match and i < len(lines)-1: # Check line below
-                match = re.search(pattern, lines[i+1], re.IGNORECASE)
+                match = pattern.search(lines[i+1])
                 
             if match:
                 deg_text = match.group(0).lower()
@@ -170,20 +208,18 @@ def extract_education_from_text(text: str) -> List[dict]:
                 break
         
         # Check for institution keywords
-        has_inst = any(re.search(r"\b" + re.escape(kw) + r"\b", line, re.IGNORECASE) for kw in inst_keywords)
+        has_inst = _INSTITUTION_RE.search(line) is not None
         
         if has_inst:
             is_edu_line = True
             if not degree: degree = "Degree"
             
             # Try to find year/duration (Search current and 2 lines above/below)
-            # Support ranges like 2020-2024 or 2023 - Present
-            year_pattern = r"\b((?:19[9]\d|20[0-2]\d)(?:\s*[-–]\s*(?:20[0-2]\d|Present|Current))?)\b"
             year_match = None
             for offset in [0, 1, -1, 2, -2]:
                 idx = i + offset
                 if 0 <= idx < len(lines):
-                    m = re.search(year_pattern, lines[idx], re.IGNORECASE)
+                    m = _YEAR_RANGE_RE.search(lines[idx])
                     if m:
                         year_match = m
                         break
@@ -194,12 +230,12 @@ def extract_education_from_text(text: str) -> List[dict]:
             institution = line[:100]
             if " - " in line:
                 parts = line.split(" - ")
-                institution = parts[1].strip() if any(re.search(p, parts[0], re.IGNORECASE) for p in degree_patterns) else parts[0].strip()
+                institution = parts[1].strip() if any(p.search(parts[0]) for p in _DEGREE_PATTERNS) else parts[0].strip()
             
-            institution = re.sub(r'^[•\d\.\-\s]+', '', institution).strip()
+            institution = _LEADING_BULLETS_RE.sub('', institution).strip()
             if institution.isupper(): institution = institution.title()
 
-            if institution and len(institution) > 5 and not any(re.search(p, institution, re.IGNORECASE) for p in blacklist_patterns):
+            if institution and len(institution) > 5 and not _EDU_BLACKLIST_RE.search(institution):
                 education.append({
                     "degree": degree,
                     "institution": institution[:80].strip(),
@@ -220,27 +256,24 @@ def extract_education_from_text(text: str) -> List[dict]:
 
 def extract_experience_from_text(text: str) -> List[dict]:
     """Extract experience details from resume text."""
+    return _experience_from_lines(text.split('\n'))
+
+
+def _experience_from_lines(lines: List[str]) -> List[dict]:
     experience = []
-    
-    # Common job titles indicating experience (using word boundaries)
-    job_keywords = ["Developer", "Engineer", "Intern", "Analyst", "Manager", "Lead", "Consultant", "Designer", "Specialist"]
-    
-    # Strictly exclude education terms from experience
-    edu_indicators = ["Bachelor", "Master", "Degree", "University", "College", "Diploma", "Puc", "Sslc", "10Th", "12Th", "Institute", "School"]
-    
-    lines = text.split('\n')
+
     for i, line in enumerate(lines):
         line = line.strip()
         if len(line) < 5 or len(line) > 100: continue
         
         # Skip lines that look like education
-        if any(re.search(r"\b" + e + r"\b", line, re.IGNORECASE) for e in edu_indicators):
+        if _EDU_INDICATOR_RE.search(line):
             continue
 
         is_exp_line = False
         title_keyword = None
-        for kw in job_keywords:
-            if re.search(r"\b" + kw + r"\b", line, re.IGNORECASE):
+        for kw, pattern in _JOB_KEYWORD_PATTERNS:
+            if pattern.search(line):
                 is_exp_line = True
                 title_keyword = kw
                 break
@@ -259,19 +292,18 @@ def extract_experience_from_text(text: str) -> List[dict]:
                      company = lines[i-1].strip()
             
             # Additional check: if company looks like a school, skip it
-            if any(re.search(r"\b" + e + r"\b", company, re.IGNORECASE) for e in edu_indicators):
+            if _EDU_INDICATOR_RE.search(company):
                 continue
 
             # Clean company
-            company = re.sub(r'^[•\d\.\-\s]+', '', company).strip()
+            company = _LEADING_BULLETS_RE.sub('', company).strip()
 
             duration = ""
-            date_pattern = r"\b((?:19[9]\d|20[0-2]\d)(?:\s*[-–]\s*(?:20[0-2]\d|Present|Current))?)\b"
-            date_match = re.search(date_pattern, line, re.IGNORECASE)
+            date_match = _YEAR_RANGE_RE.search(line)
             if not date_match and i < len(lines) - 1:
-                date_match = re.search(date_pattern, lines[i+1], re.IGNORECASE)
+                date_match = _YEAR_RANGE_RE.search(lines[i+1])
             if not date_match and i > 0:
-                date_match = re.search(date_pattern, lines[i-1], re.IGNORECASE)
+                date_match = _YEAR_RANGE_RE.search(lines[i-1])
             
             if date_match:
                 duration = date_match.group(1).strip()
@@ -293,6 +325,10 @@ def extract_experience_from_text(text: str) -> List[dict]:
     return unique_exp[:3]
 
 
+def extract_resume_details(text: str) -> Tuple[List[str], List[dict], List[dict]]:
+    """Extract (skills, education, experience) in one call, splitting the text into lines once."""
+    lines = text.split('\n')
+    return extract_skills_from_text(text), _education_from_lines(lines), _experience_from_lines(lines)
 
 
 
@@ -322,15 +358,8 @@ def calculate_resume_match_score(
     skill_match_score = (len(matched) / len(job_skills_lower)) * 100 if job_skills_lower else 0
 
     # Keyword match score (from job description in resume text)
-    job_words = set(re.findall(r'\b\w+\b', job_description.lower()))
-    resume_words = set(re.findall(r'\b\w+\b', resume_text.lower()))
-    # Remove common stop words
-    stop_words = {"the", "a", "an", "is", "are", "was", "were", "be", "been",
-                  "being", "have", "has", "had", "do", "does", "did", "will",
-                  "would", "could", "should", "may", "might", "and", "or", "but",
-                  "in", "on", "at", "to", "for", "of", "with", "by", "from"}
-    job_words -= stop_words
-    resume_words -= stop_words
+    job_words = _extract_words(job_description)
+    resume_words = _extract_words(resume_text)
     keyword_overlap = job_words.intersection(resume_words)
     keyword_match_score = (len(keyword_overlap) / len(job_words)) * 100 if job_words else 0
 
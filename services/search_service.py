@@ -1,8 +1,57 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import or_, and_, bindparam, func, select, update, literal, literal_column
+from sqlalchemy.dialects.postgresql import array
 from typing import List, Optional
-from models.job import Job
+import hashlib
+import json
+from models.job import Job, JOB_SEARCH_TSVECTOR, search_skills
 from models.recruiter import RecruiterProfile
+from services.cache_service import cache
+
+JOB_SEARCH_CACHE_PREFIX = "job_search:"
+
+
+def job_search_cache_key(params: dict) -> str:
+    """Cache key for one combination of search filters and page."""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{JOB_SEARCH_CACHE_PREFIX}{digest}"
+
+
+def invalidate_job_search():
+    """Drop every cached search page after a visible job is approved, edited or withdrawn."""
+    cache.delete_prefix(JOB_SEARCH_CACHE_PREFIX)
+
+
+def backfill_job_skills_search(db: Session):
+    """Fill skills_search for jobs saved before the column existed, so skill filters can match them."""
+    rows = db.query(Job.id, Job.skills_required).filter(Job.skills_search.is_(None)).all()
+    if not rows:
+        return
+    jobs = Job.__table__
+    # updated_at is kept as is: this is a storage backfill, not an edit of the job
+    stmt = update(jobs).where(jobs.c.id == bindparam("job_id")).values(
+        skills_search=bindparam("skills"), updated_at=jobs.c.updated_at
+    )
+    db.execute(stmt, [{"job_id": job_id, "skills": search_skills(skills)} for job_id, skills in rows])
+    db.commit()
+
+
+def _has_any_skill(db: Session, wanted_skills: List[str]):
+    """Filter matching jobs whose lowercased skills_search contains any of wanted_skills."""
+    if db.get_bind().dialect.name == "postgresql":
+        # jsonb ?| text[] - served by the GIN index on skills_search
+        return Job.skills_search.op("?|")(array(wanted_skills))
+    skill_values = func.json_each(Job.skills_search).table_valued("value")
+    return select(literal(1)).select_from(skill_values).where(skill_values.c.value.in_(wanted_skills)).exists()
+
+
+def json_array_has_any(db: Session, column, wanted_lower: List[str]):
+    """EXISTS clause: the JSON string array in column has an element that lowercases to one of wanted_lower."""
+    if db.get_bind().dialect.name == "postgresql":
+        values = func.json_array_elements_text(column).table_valued("value")
+    else:
+        values = func.json_each(column).table_valued("value")
+    return select(literal(1)).select_from(values).where(func.lower(values.c.value).in_(wanted_lower)).exists()
 
 
 def search_jobs(
@@ -20,13 +69,23 @@ def search_jobs(
 ) -> dict:
     """Advanced job search with filters, sorting, and pagination."""
 
-    base_query = db.query(Job).filter(
+    # Only the columns the search results render (skips skills_search and bookkeeping columns);
+    # company names for the page's recruiters come in one extra IN query
+    base_query = db.query(Job).options(load_only(
+        Job.id, Job.recruiter_id, Job.title, Job.description, Job.requirements, Job.skills_required,
+        Job.location, Job.is_remote, Job.stipend_min, Job.stipend_max, Job.job_type, Job.duration,
+        Job.openings, Job.deadline, Job.created_at,
+    ), selectinload(Job.recruiter).load_only(RecruiterProfile.company_name)).filter(
         Job.is_approved == True,
         Job.is_active == True
     )
 
-    # Text search in title and description
-    if query:
+    # Text search in title and description: full-text via the GIN index on Postgres, ILIKE elsewhere
+    ts_query = None
+    if query and db.get_bind().dialect.name == "postgresql":
+        ts_query = func.websearch_to_tsquery("english", query)
+        base_query = base_query.filter(literal_column(JOB_SEARCH_TSVECTOR).op("@@")(ts_query))
+    elif query:
         search_term = f"%{query}%"
         base_query = base_query.filter(
             or_(
@@ -40,14 +99,9 @@ def search_jobs(
         base_query = base_query.filter(Job.location.ilike(f"%{location}%"))
 
     # Skills filter - check if any required skill matches
-    if skills:
-        skill_filters = []
-        for skill in skills:
-            skill_filters.append(
-                func.lower(func.cast(Job.skills_required, db.bind.dialect.name == 'sqlite' and 'TEXT' or 'VARCHAR')).contains(skill.lower())
-            )
-        if skill_filters:
-            base_query = base_query.filter(or_(*skill_filters))
+    wanted_skills = sorted({s.strip().lower() for s in (skills or []) if s and s.strip()})
+    if wanted_skills:
+        base_query = base_query.filter(_has_any_skill(db, wanted_skills))
 
     # Stipend range filter
     if stipend_min is not None:
@@ -67,20 +121,24 @@ def search_jobs(
     if is_remote is not None:
         base_query = base_query.filter(Job.is_remote == is_remote)
 
-    # Get total count before pagination
-    total_count = base_query.count()
-
     # Sorting
-    if sort_by == "stipend":
+    if sort_by == "relevance" and ts_query is not None:
+        base_query = base_query.order_by(func.ts_rank_cd(literal_column(JOB_SEARCH_TSVECTOR), ts_query).desc())
+    elif sort_by == "stipend":
         base_query = base_query.order_by(Job.stipend_max.desc().nullslast())
     elif sort_by == "views":
         base_query = base_query.order_by(Job.views_count.desc())
     else:  # default: created_at
         base_query = base_query.order_by(Job.created_at.desc())
 
-    # Pagination
+    # Pagination, with the total carried on every row via COUNT(*) OVER ()
     offset = (page - 1) * page_size
-    jobs = base_query.offset(offset).limit(page_size).all()
+    rows = base_query.add_columns(func.count().over().label("total")).offset(offset).limit(page_size).all()
+    jobs = [row[0] for row in rows]
+    if rows:
+        total_count = rows[0].total
+    else:
+        total_count = base_query.order_by(None).count() if page > 1 else 0
 
     return {
         "jobs": jobs,
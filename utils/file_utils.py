@@ -1,42 +1,67 @@
 import os
-import uuid
-from fastapi import UploadFile
+import hashlib
+import mimetypes
+import secrets
+from typing import Optional
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 from config import settings
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
 
-async def save_upload_file(upload_file: UploadFile, subdirectory: str = "media") -> dict:
-    """Save an uploaded file and return file info."""
-    # Generate unique filename
+
+async def save_upload_file(
+    upload_file: UploadFile, subdirectory: str = "media", max_bytes: Optional[int] = None
+) -> dict:
+    """Save an uploaded file and return file info, rejecting it with 413 past max_bytes."""
+    # Generate unique filename, sharded by its first two hex chars; the shard dir is created on first use
     file_ext = os.path.splitext(upload_file.filename)[1]
-    unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, subdirectory, unique_filename)
+    unique_filename = f"{secrets.token_hex(16)}{file_ext}"
+    file_path = os.path.join(settings.UPLOAD_DIR, subdirectory, unique_filename[:2], unique_filename)
+    await aiofiles.os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Stream to disk in chunks without blocking the event loop, hashing as we go
+    file_size = 0
+    hasher = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if max_bytes is not None and file_size > max_bytes:
+                break
+            hasher.update(chunk)
+            await f.write(chunk)
 
-    # Read and save file
-    content = await upload_file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    if max_bytes is not None and file_size > max_bytes:
+        delete_file(file_path)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB",
+        )
 
     return {
         "filename": upload_file.filename,
         "saved_filename": unique_filename,
         "file_path": file_path,
-        "file_size": len(content),
+        "file_size": file_size,
+        "sha256": hasher.hexdigest(),
         "content_type": upload_file.content_type,
     }
 
 
-def get_file_response(file_path: str, filename: str) -> FileResponse:
-    """Create a file download response."""
-    if not os.path.exists(file_path):
+def get_file_response(file_path: str, filename: str, media_type: Optional[str] = None) -> FileResponse:
+    """Create a file download response; media_type is guessed from filename when not given."""
+    # One stat serves both the existence check and the response headers
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         return None
     return FileResponse(
         path=file_path,
         filename=filename,
-        media_type="application/octet-stream",
+        stat_result=stat_result,
+        media_type=media_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
     )
 
 